@@ -0,0 +1,218 @@
+# asyncio facade over the Application and OrderManager, with awaitable order handles
+
+import asyncio
+from collections import deque
+
+
+class OrderRejected(Exception):
+    """
+    The order was rejected by the counterparty or could not be sent.
+    """
+
+
+class CancelRejected(Exception):
+    """
+    The cancel request was rejected by the counterparty or left unanswered; the order stays open.
+    """
+
+
+class OrderHandle:
+    """
+    An order submitted through the AsyncClient.
+
+    The futures resolve on the event loop:
+        acked: the Order, on the NEW acknowledgement.
+        filled: the Order, on the fill completing it; None if the order is cancelled.
+        cancelled: the Order, on the cancel confirmation; None if the order is filled.
+    All three raise OrderRejected if the order is rejected.
+    """
+    def __init__(self, client, cl_ord_id, symbol, side, quantity, price, loop):
+        self.client = client
+        self.cl_ord_id = cl_ord_id
+        self.symbol = symbol
+        self.side = side
+        self.quantity = quantity
+        self.price = price
+        self.filled_quantity = 0
+        self.acked = loop.create_future()
+        self.filled = loop.create_future()
+        self.cancelled = loop.create_future()
+        self.cancel_rejected = None # future of the last cancel request, failed if it is rejected
+
+    @property
+    def done(self):
+        return self.filled.done() and self.cancelled.done()
+
+    def __await__(self):
+        """
+        Wait for the order to be filled or cancelled.
+
+        Returns:
+            Order: The final state of the order.
+        """
+        return self._wait().__await__()
+
+    async def _wait(self):
+        await asyncio.wait((self.filled, self.cancelled), return_when=asyncio.FIRST_COMPLETED)
+        return self.filled.result() or self.cancelled.result()
+
+    async def cancel(self):
+        """
+        Send an OrderCancelRequest for this order and wait for the cancel confirmation.
+
+        Returns:
+            Order: The cancelled order, or None if it was filled first.
+
+        Raises:
+            CancelRejected: The cancel request was rejected; the order stays open.
+        """
+        await self.acked
+        if not self.done:
+            self.cancel_rejected = self.client.loop.create_future()
+            if await self.client.cancel(self) is None:
+                return None # the request was not sent, or a cancel is already pending
+            await asyncio.wait((self.cancelled, self.cancel_rejected), return_when=asyncio.FIRST_COMPLETED)
+            if not self.cancelled.done():
+                return self.cancel_rejected.result() # raises CancelRejected
+        return await self.cancelled
+
+    def __repr__(self):
+        return f"OrderHandle({self.cl_ord_id}, {self.symbol}, side={self.side}, quantity={self.quantity}, filled_quantity={self.filled_quantity})"
+
+
+def _resolve(future, result):
+    if not future.done():
+        future.set_result(result)
+
+
+def _fail(future, error):
+    if not future.done():
+        future.set_exception(error)
+        future.exception() # retrieved, so unawaited futures are not reported
+
+
+class AsyncClient:
+    """
+    Submit orders from asyncio code and await their outcome.
+
+    The OrderManager notifies its listeners on its worker thread; the client queues those
+    events and hands them to the event loop with a single loop.call_soon_threadsafe per
+    batch, so thousands of orders can be in flight without a thread per order.
+    """
+    def __init__(self, application, session_id, loop=None):
+        """
+        Args:
+            application (Application): The FIX application sending the orders.
+            session_id (SessionID): The session to send the orders on.
+            loop (AbstractEventLoop): The event loop resolving the handles, the running loop if None.
+        """
+        self.application = application
+        self.order_manager = application.order_manager
+        self.session_id = session_id
+        self.loop = loop or asyncio.get_running_loop()
+        self.handles = {} # cl_ord_id -> OrderHandle, until the order is filled, cancelled or rejected
+        self.events = deque() # (event, cl_ord_id, filled_quantity, order) from the OrderManager's threads
+        self.scheduled = False
+        self.order_manager.add_listener(self.on_event)
+
+    def close(self):
+        self.order_manager.remove_listener(self.on_event)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+    async def submit(self, symbol, side, order_type, quantity, price=None):
+        """
+        Send a NewOrderSingle.
+
+        Args:
+            symbol (str): The symbol being traded.
+            side (str): The side of the order (BUY, SELL, or SHORT).
+            order_type (str): The order type (fix.OrdType_LIMIT or fix.OrdType_MARKET).
+            quantity (int): The order quantity.
+            price (float): The limit price, for limit orders.
+
+        Returns:
+            OrderHandle: The handle of the order, whose futures resolve as execution reports arrive.
+        """
+        cl_ord_id = self.application.cl_ord_ids.next()
+        handle = OrderHandle(self, cl_ord_id, symbol, side, quantity, price, self.loop)
+        if not await self._reserve(cl_ord_id):
+            self._reject(handle) # the window stayed full
+            return handle
+        self.handles[cl_ord_id] = handle # registered before sending, the ack may come back first
+        if self.application.send_order(self.session_id, symbol, side, order_type, quantity, price,
+                                       cl_ord_id=cl_ord_id, reserved=True) is None:
+            self.handles.pop(cl_ord_id, None)
+            self._reject(handle)
+        return handle
+
+    async def cancel(self, handle):
+        """
+        Send an OrderCancelRequest for an order through OrderManager.cancel_order, which marks it
+        pending cancel, without waiting for the outcome; await handle.cancelled for it.
+
+        Returns:
+            str: The ClOrdID of the cancel request, or None if it was not sent.
+        """
+        cancel_id = self.application.cl_ord_ids.next()
+        if not await self._reserve(cancel_id):
+            return None
+        sent = self.order_manager.cancel_order(self.application, self.session_id, handle.cl_ord_id,
+                                               cancel_id=cancel_id, reserved=True)
+        if sent is None:
+            self.application.window.discard(cancel_id) # nothing sent, e.g. the order is already pending cancel
+        return sent
+
+    async def _reserve(self, cl_ord_id):
+        # enter the request in the in-flight window without blocking the event loop: at once if
+        # there is room, else by waiting for room on an executor thread
+        window = self.application.window
+        if window.acquire(cl_ord_id, 0):
+            return True
+        return await self.loop.run_in_executor(None, window.acquire, cl_ord_id, self.application.window_timeout)
+
+    def on_event(self, event, order):
+        # called by the OrderManager with its lock held, on its worker thread
+        if order.cl_ord_id not in self.handles:
+            return
+        self.events.append((event, order.cl_ord_id, order.filled_quantity, order))
+        if not self.scheduled:
+            self.scheduled = True
+            self.loop.call_soon_threadsafe(self._dispatch)
+
+    def _dispatch(self):
+        # runs on the event loop; clear the flag first, so events queued while draining schedule a new call
+        self.scheduled = False
+        events, handles = self.events, self.handles
+        while events:
+            event, cl_ord_id, filled_quantity, order = events.popleft()
+            handle = handles.get(cl_ord_id)
+            if handle is None:
+                continue
+            if event == 'new':
+                _resolve(handle.acked, order)
+            elif event == 'fill':
+                handle.filled_quantity = filled_quantity
+                if filled_quantity >= handle.quantity:
+                    del handles[cl_ord_id]
+                    _resolve(handle.filled, order)
+                    _resolve(handle.cancelled, None)
+            elif event == 'cancel':
+                del handles[cl_ord_id]
+                _resolve(handle.cancelled, order)
+                _resolve(handle.filled, None)
+            elif event == 'reject':
+                del handles[cl_ord_id]
+                self._reject(handle)
+            elif event == 'cancel_reject':
+                if handle.cancel_rejected is not None: # the order stays open, keep its handle
+                    _fail(handle.cancel_rejected, CancelRejected(cl_ord_id))
+
+    def _reject(self, handle):
+        error = OrderRejected(handle.cl_ord_id)
+        for future in (handle.acked, handle.filled, handle.cancelled):
+            _fail(future, error)
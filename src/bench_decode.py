@@ -0,0 +1,94 @@
+# microbenchmark of the per-message ExecutionReport decoding cost
+
+import argparse
+import time
+import quickfix as fix
+import quickfix42 as fix42
+from execution_decoder import ExecutionReportDecoder, decode_raw
+
+
+def build_execution_report(exec_type):
+    """
+    Build an ExecutionReport like the ones the counterparty sends.
+
+    Args:
+        exec_type (str): The ExecType of the report.
+
+    Returns:
+        Message: The execution report.
+    """
+    message = fix42.ExecutionReport()
+    message.getHeader().setField(fix.MsgType(fix.MsgType_ExecutionReport))
+    message.setField(fix.OrderID('ORD1'))
+    message.setField(fix.ExecID('EXEC1'))
+    message.setField(fix.ExecTransType(fix.ExecTransType_NEW))
+    message.setField(fix.ExecType(exec_type))
+    message.setField(fix.OrdStatus(exec_type))
+    message.setField(fix.ClOrdID('1_1700000000000'))
+    message.setField(fix.OrigClOrdID('1_1700000000000'))
+    message.setField(fix.Symbol('MSFT'))
+    message.setField(fix.Side(fix.Side_BUY))
+    message.setField(fix.OrderQty(100))
+    message.setField(fix.Price(150.25))
+    message.setField(fix.LastPx(150.25))
+    message.setField(fix.LastQty(40))
+    message.setField(fix.LeavesQty(60))
+    message.setField(fix.CumQty(40))
+    message.setField(fix.AvgPx(150.25))
+    return message
+
+
+def legacy_decode(message):
+    # the field extraction done by Application.onMessage/onExecutionReport before the decoder
+    msgType = fix.MsgType()
+    message.getHeader().getField(msgType)
+    symbol = fix.Symbol()
+    side = fix.Side()
+    cl_ord_id = fix.ClOrdID()
+    message.getField(symbol)
+    message.getField(side)
+    message.getField(cl_ord_id)
+    exec_type = fix.ExecType()
+    message.getField(exec_type)
+    lastPx = fix.LastPx()
+    lastQty = fix.LastQty()
+    message.getField(lastPx)
+    message.getField(lastQty)
+    return (cl_ord_id.getString(), symbol.getString(), lastPx.getValue(), lastQty.getValue(), side.getValue())
+
+
+def bench(name, decode, message, iterations):
+    decode(message) # warm up
+    start = time.perf_counter()
+    for _ in range(iterations):
+        decode(message)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<28} {elapsed / iterations * 1e9:10.0f} ns/msg")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the per-message ExecutionReport decoding cost")
+    parser.add_argument('--iterations', type=int, default=200000)
+    args = parser.parse_args()
+
+    message = build_execution_report(fix.ExecType_PARTIAL_FILL)
+    raw = message.toString()
+    decoder = ExecutionReportDecoder()
+
+    def reused_holders(message):
+        decoder.get_msg_type(message)
+        return decoder.decode(message)
+
+    baseline = bench("legacy (new field objects)", legacy_decode, message, args.iterations)
+    for name, decode, payload in [
+        ("reused field holders", reused_holders, message),
+        ("raw string", decode_raw, raw),
+        ("raw string incl. toString", lambda message: decode_raw(message.toString()), message),
+    ]:
+        elapsed = bench(name, decode, payload, args.iterations)
+        print(f"{'':<28} {baseline / elapsed:10.2f}x vs legacy")
+
+
+if __name__ == "__main__":
+    main()
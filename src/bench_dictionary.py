@@ -0,0 +1,73 @@
+# startup and validation cost of the full versus the trimmed data dictionary
+
+import argparse
+import time
+import quickfix as fix
+import quickfix42 as fix42
+from dictionary_builder import SOURCE, ensure_dictionary
+
+
+def sample_report():
+    """
+    A filled ExecutionReport as received from the counterparty, as a raw string.
+    """
+    report = fix42.ExecutionReport()
+    header = report.getHeader()
+    header.setField(fix.SenderCompID("SERVER"))
+    header.setField(fix.TargetCompID("CLIENT"))
+    header.setField(fix.MsgSeqNum(1))
+    header.setField(fix.SendingTime())
+    report.setField(fix.OrderID("1"))
+    report.setField(fix.ExecID("1"))
+    report.setField(fix.ExecTransType(fix.ExecTransType_NEW))
+    report.setField(fix.ExecType(fix.ExecType_FILL))
+    report.setField(fix.OrdStatus(fix.OrdStatus_FILLED))
+    report.setField(fix.ClOrdID("lq2x1k3_1"))
+    report.setField(fix.Symbol("MSFT"))
+    report.setField(fix.Side(fix.Side_BUY))
+    report.setField(fix.OrderQty(100))
+    report.setField(fix.Price(150.25))
+    report.setField(fix.LastPx(150.25))
+    report.setField(fix.LastShares(100))
+    report.setField(fix.LeavesQty(0))
+    report.setField(fix.CumQty(100))
+    report.setField(fix.AvgPx(150.25))
+    return report.toString()
+
+
+def bench_load(path, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fix.DataDictionary(path)
+    return (time.perf_counter() - start) / repeat
+
+
+def bench_validate(path, raw, repeat):
+    """
+    Parse the raw message against the dictionary and validate it, as the engine does for every received message.
+    """
+    dictionary = fix.DataDictionary(path)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        message = fix.Message(raw, dictionary, True)
+        dictionary.validate(message)
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the full and trimmed FIX 4.2 data dictionaries")
+    parser.add_argument('--load-repeat', type=int, default=20)
+    parser.add_argument('--validate-repeat', type=int, default=100000)
+    args = parser.parse_args()
+
+    trimmed = ensure_dictionary()
+    raw = sample_report()
+    print(f"{'Dictionary':<20} {'Load ms':>9} {'Parse+validate us':>18}")
+    for name, path in (('full', SOURCE), ('trimmed', trimmed)):
+        load = bench_load(path, args.load_repeat)
+        validate = bench_validate(path, raw, args.validate_repeat)
+        print(f"{name:<20} {load * 1e3:>9.2f} {validate * 1e6:>18.2f}")
+
+
+if __name__ == "__main__":
+    main()
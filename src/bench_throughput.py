@@ -0,0 +1,103 @@
+# throughput benchmark of the client against the local simulated acceptor
+
+import argparse
+import logging
+import multiprocessing
+import time
+import quickfix as fix
+from fix_client import Application
+from order_manager import OrderManager
+from latency import LatencyTracker, ALL_SYMBOLS, STAGE_ACK
+from logger import configure_logging
+from scenario import Scenario
+from simulator import run_simulator
+
+
+def run_step(application, order_manager, session_id, symbols, rate, order_count, drain_timeout, seed=None):
+    """
+    Send order_count orders at the target rate and wait until they are all acknowledged and drained.
+    The orders are generated up front from the seed, so steps are reproducible and generation
+    is not measured.
+
+    Returns:
+        dict: The measured throughput, CPU per order and ack latency percentiles.
+    """
+    scenario = Scenario.generate(symbols, order_count, rate, arrivals='uniform', seed=seed)
+    application.latency = LatencyTracker()
+    acked_before = order_manager.orders_sent
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    order_manager.replay_orders(application, session_id, scenario)
+    send_elapsed = time.perf_counter() - start
+    drained = order_manager.wait_until_drained(drain_timeout, idle=0.5)
+    elapsed = time.perf_counter() - start
+    cpu = time.process_time() - cpu_start
+    acked = order_manager.orders_sent - acked_before
+    latency = application.latency.summary().get((ALL_SYMBOLS, STAGE_ACK), {})
+    return {
+        'rate': rate,
+        'sent_rate': order_count / send_elapsed,
+        'throughput': acked / elapsed,
+        'acked': acked,
+        'drained': drained,
+        'cpu_us_per_order': cpu / order_count * 1e6,
+        'ack_p50_us': latency.get('p50'),
+        'ack_p99_us': latency.get('p99'),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure sustained order throughput against the local simulator")
+    parser.add_argument('--config', default="../config/fix_local.cfg")
+    parser.add_argument('--simulator-config', default="../config/simulator.cfg")
+    parser.add_argument('--rates', type=float, nargs='+', default=[100, 500, 1000, 2000], help="target orders per second")
+    parser.add_argument('--seconds', type=float, default=5, help="duration of each rate step")
+    parser.add_argument('--fill-ratio', type=float, default=1.0)
+    parser.add_argument('--partial-fills', type=int, default=1)
+    parser.add_argument('--fill-delay', type=float, default=0.0)
+    parser.add_argument('--drain-timeout', type=float, default=30)
+    parser.add_argument('--seed', type=int, default=1, help="seed of the generated orders")
+    args = parser.parse_args()
+    log_listener = configure_logging(logging.WARNING)
+
+    # the simulator runs in its own process so it does not share the client's GIL
+    stop_simulator = multiprocessing.Event()
+    simulator = multiprocessing.Process(target=run_simulator, args=(args.simulator_config, stop_simulator),
+                                        kwargs={'fill_ratio': args.fill_ratio, 'partial_fills': args.partial_fills,
+                                                'fill_delay': args.fill_delay, 'seed': 1})
+    simulator.start()
+
+    order_manager = OrderManager()
+    application = Application(order_manager)
+    settings = fix.SessionSettings(args.config)
+    initiator = fix.SocketInitiator(application, fix.FileStoreFactory(settings), settings, fix.FileLogFactory(settings))
+    symbols = ["MSFT", "AAPL", "BAC"]
+    results = []
+    try:
+        order_manager.start()
+        initiator.start()
+        if not application.wait_for_logon(30):
+            print("Could not logon to the simulator")
+            return
+        session = settings.get().getSessions()[0]
+        session_id = fix.SessionID("FIX.4.2", settings.get(session).getString(fix.SenderCompID()),
+                                   settings.get(session).getString(fix.TargetCompID()))
+        for step, rate in enumerate(args.rates):
+            results.append(run_step(application, order_manager, session_id, symbols, rate,
+                                    int(rate * args.seconds), args.drain_timeout, seed=args.seed + step))
+    finally:
+        initiator.stop()
+        order_manager.stop()
+        stop_simulator.set()
+        simulator.join()
+        log_listener.stop()
+
+    print(f"{'Target/s':>9} {'Sent/s':>9} {'Acked/s':>9} {'Acked':>7} {'Drained':>8} {'CPU us/order':>13} {'Ack p50 us':>11} {'Ack p99 us':>11}")
+    for result in results:
+        print(f"{result['rate']:>9.0f} {result['sent_rate']:>9.0f} {result['throughput']:>9.0f} {result['acked']:>7} "
+              f"{str(result['drained']):>8} {result['cpu_us_per_order']:>13.1f} "
+              f"{result['ack_p50_us'] or 0:>11.1f} {result['ack_p99_us'] or 0:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+# event-driven scheduling of order cancellations
+
+import random
+import time
+from collections import deque
+
+
+class RandomCancelPolicy:
+    """
+    Cancel a random open order every `interval` seconds. Orders already pending cancel are
+    skipped, retrying after `interval` if only those were drawn.
+    """
+    def __init__(self, interval=0.1, rng=random):
+        self.interval = interval
+        self.rng = rng
+        self.next_time = 0.0
+
+    def on_order(self, order):
+        pass
+
+    def select(self, book, now):
+        """
+        Pick the next order to cancel.
+
+        Args:
+            book (OrderBook): The open orders.
+            now (float): The current time.monotonic() value.
+
+        Returns:
+            tuple: (order to cancel or None, seconds to wait before asking again or None to wait for a new order).
+        """
+        if not book:
+            return None, None
+        if now < self.next_time:
+            return None, self.next_time - now
+        self.next_time = now + self.interval
+        for _ in range(8): # a few draws, as usually most open orders are not pending cancel
+            order = book.sample(self.rng)
+            if order.pending_cancel is None:
+                return order, None
+        return None, self.interval
+
+
+class SymbolCancelPolicy:
+    """
+    Cancel orders once they have been open for longer than the maximum age of their symbol.
+
+    Orders of each symbol are queued in acknowledgement order, so their deadlines are
+    increasing and only the head of each queue has to be checked.
+    """
+    def __init__(self, max_ages, default_max_age=None):
+        """
+        Args:
+            max_ages (dict): Maximum age in seconds for each symbol.
+            default_max_age (float): Maximum age for symbols not in max_ages, None to never cancel them.
+        """
+        self.max_ages = max_ages
+        self.default_max_age = default_max_age
+        self.queues = {} # symbol -> deque of (deadline, cl_ord_id)
+
+    def on_order(self, order):
+        max_age = self.max_ages.get(order.symbol, self.default_max_age)
+        if max_age is not None:
+            self.queues.setdefault(order.symbol, deque()).append((order.ack_time + max_age, order.cl_ord_id))
+
+    def select(self, book, now):
+        earliest = None
+        for queue in self.queues.values():
+            # drop the orders that were filled or cancelled in the meantime
+            while queue and queue[0][1] not in book:
+                queue.popleft()
+            if not queue:
+                continue
+            deadline, cl_ord_id = queue[0]
+            if deadline <= now:
+                queue.popleft()
+                return book.get(cl_ord_id), None
+            if earliest is None or deadline < earliest:
+                earliest = deadline
+        return None, (None if earliest is None else earliest - now)
+
+
+class AgeCancelPolicy(SymbolCancelPolicy):
+    """
+    Cancel any order once it has been open for longer than `max_age` seconds.
+    """
+    def __init__(self, max_age):
+        super().__init__({}, max_age)
+
+
+class CancelScheduler:
+    """
+    Dispatch cancel requests as soon as the policy makes an order eligible.
+
+    The scheduler blocks on the OrderManager's state condition, which is notified when a
+    NEW acknowledgement is applied, so it uses no CPU while there is nothing to cancel.
+    """
+    def __init__(self, order_manager, fix_client, session_id, policy):
+        self.order_manager = order_manager
+        self.fix_client = fix_client
+        self.session_id = session_id
+        self.policy = policy
+        self.running = True
+        self.cancels_sent = 0
+        with order_manager.state_changed:
+            for order in sorted(order_manager.active_orders.values(), key=lambda order: order.ack_time):
+                policy.on_order(order)
+            order_manager.add_listener(self.on_event)
+
+    def on_event(self, event, order):
+        # called by the OrderManager with its lock held
+        if event == 'new':
+            self.policy.on_order(order)
+
+    def stop(self):
+        with self.order_manager.state_changed:
+            self.running = False
+            self.order_manager.state_changed.notify_all()
+
+    def run(self, duration=None, until_empty=False):
+        """
+        Send cancel requests until stopped, until `duration` has elapsed or, with `until_empty`,
+        until there are no open orders left.
+
+        Args:
+            duration (float): Maximum run time in seconds, None to run until stopped.
+            until_empty (bool): Return as soon as the book is empty.
+        """
+        state_changed = self.order_manager.state_changed
+        book = self.order_manager.active_orders
+        end_time = None if duration is None else time.monotonic() + duration
+        try:
+            while True:
+                with state_changed:
+                    while True:
+                        now = time.monotonic()
+                        if not self.running or (end_time is not None and now >= end_time) or (until_empty and not book):
+                            return
+                        order, wait = self.policy.select(book, now)
+                        if order is not None:
+                            if order.pending_cancel is None:
+                                cl_ord_id = order.cl_ord_id
+                                break
+                            continue # already being cancelled, ask the policy for its next choice
+                        if end_time is not None:
+                            wait = end_time - now if wait is None else min(wait, end_time - now)
+                        state_changed.wait(wait)
+                if self.order_manager.cancel_order(self.fix_client, self.session_id, cl_ord_id) is not None:
+                    self.cancels_sent += 1
+        finally:
+            self.order_manager.remove_listener(self.on_event)
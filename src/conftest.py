@@ -0,0 +1,7 @@
+# make the flat src modules importable when pytest runs from the repository root, where the
+# standard library's statistics module may already be imported in place of src/statistics.py
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.modules.pop('statistics', None)
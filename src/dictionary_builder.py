@@ -0,0 +1,106 @@
+# derive a trimmed FIX data dictionary holding only the messages and fields the client exchanges
+
+import argparse
+import hashlib
+import os
+import xml.etree.ElementTree as ET
+
+SOURCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'spec', 'FIX42.xml')
+DESTINATION = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'spec', 'FIX42_trimmed.xml')
+
+# session level messages: Heartbeat, TestRequest, ResendRequest, Reject, SequenceReset, Logout, Logon
+ADMIN_MESSAGE_TYPES = ('0', '1', '2', '3', '4', '5', 'A')
+# application messages: ExecutionReport, OrderCancelReject, NewOrderSingle, OrderCancelRequest, BusinessMessageReject
+APP_MESSAGE_TYPES = ('8', '9', 'D', 'F', 'j')
+MESSAGE_TYPES = ADMIN_MESSAGE_TYPES + APP_MESSAGE_TYPES
+
+STAMP = 'generated by dictionary_builder.py from {source} sha256={digest} messages={messages}'
+
+
+def source_digest(source):
+    with open(source, 'rb') as file:
+        return hashlib.sha256(file.read()).hexdigest()
+
+
+def referenced_fields(element):
+    """
+    Names of the fields and repeating group counters used under an element, at any depth.
+    """
+    return {child.get('name') for child in element.iter() if child.tag in ('field', 'group')}
+
+
+def remove_children(parent, keep):
+    """
+    Remove the children of parent for which keep(child) is false, keeping the indentation of the closing tag.
+    """
+    tail = parent[-1].tail if len(parent) else None
+    for child in list(parent):
+        if not keep(child):
+            parent.remove(child)
+    if len(parent):
+        parent[-1].tail = tail
+
+
+def build_dictionary(source=SOURCE, destination=DESTINATION, message_types=MESSAGE_TYPES):
+    """
+    Write a dictionary keeping the header, the trailer, the given messages and the field
+    definitions they reference. Messages are copied as they are, so the relaxed required
+    fields (and their comments) of the source dictionary are kept.
+
+    Args:
+        source (str): The full data dictionary.
+        destination (str): Path of the trimmed data dictionary.
+        message_types (tuple): MsgType values of the messages to keep.
+
+    Returns:
+        tuple: (messages kept, fields kept).
+    """
+    parser = ET.XMLParser(target=ET.TreeBuilder(insert_comments=True))
+    tree = ET.parse(source, parser)
+    root = tree.getroot()
+
+    messages = root.find('messages')
+    remove_children(messages, lambda message: message.tag != 'message' or message.get('msgtype') in message_types)
+
+    used = referenced_fields(root.find('header')) | referenced_fields(root.find('trailer')) | referenced_fields(messages)
+    fields = root.find('fields')
+    remove_children(fields, lambda field: field.tag != 'field' or field.get('name') in used)
+
+    stamp = ET.Comment(STAMP.format(source=os.path.basename(source), digest=source_digest(source),
+                                    messages=','.join(message_types)))
+    stamp.tail = root.text
+    root.insert(0, stamp)
+    tree.write(destination, encoding='utf-8', xml_declaration=False)
+    return len(messages.findall('message')), len(fields.findall('field'))
+
+
+def ensure_dictionary(source=SOURCE, destination=DESTINATION, message_types=MESSAGE_TYPES):
+    """
+    Return the trimmed dictionary, rebuilding it only if the source or the messages changed.
+
+    Returns:
+        str: The path of the trimmed data dictionary.
+    """
+    expected = STAMP.format(source=os.path.basename(source), digest=source_digest(source),
+                            messages=','.join(message_types))
+    if os.path.exists(destination):
+        with open(destination, encoding='utf-8') as file:
+            head = file.read(4096)
+        if expected in head:
+            return destination
+    build_dictionary(source, destination, message_types)
+    return destination
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the trimmed FIX 4.2 data dictionary")
+    parser.add_argument('--source', default=SOURCE)
+    parser.add_argument('--destination', default=DESTINATION)
+    parser.add_argument('--messages', nargs='+', default=list(MESSAGE_TYPES), help="MsgType values to keep")
+    args = parser.parse_args()
+    message_count, field_count = build_dictionary(args.source, args.destination, tuple(args.messages))
+    print(f"Wrote {args.destination}: {message_count} messages, {field_count} fields")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# bounded single-producer / single-consumer ring buffer between the FIX thread and the OrderManager
+
+import threading
+from collections import deque
+
+
+class EventQueue:
+    """
+    Ring buffer of preallocated slots, written only by the producer (the QuickFIX callback
+    thread) and read only by the consumer (the OrderManager worker).
+
+    Each index is written by a single thread, so no lock is taken on the fast path. The
+    producer never blocks: when the ring is full, events spill into an overflow deque, which
+    the consumer drains after the ring so the event order is preserved.
+
+    Other threads hand their (rare) events over with post(), through a separate deque whose
+    appends are atomic; those are not ordered with respect to the producer's events.
+    """
+    def __init__(self, capacity=65536):
+        self.capacity = capacity
+        self.slots = [None] * capacity
+        self.head = 0 # next slot to read, owned by the consumer
+        self.tail = 0 # next slot to write, owned by the producer
+        self.overflow = deque()
+        self.overflows = 0
+        self.posted = deque() # events from threads other than the producer
+        self.waiting = False
+        self.wakeup = threading.Event()
+
+    def __len__(self):
+        return self.tail - self.head + len(self.overflow) + len(self.posted)
+
+    def put(self, event):
+        """
+        Append an event. Never blocks.
+
+        Args:
+            event (tuple): The event to append.
+        """
+        tail = self.tail
+        if self.overflow or tail - self.head >= self.capacity:
+            self.overflow.append(event)
+            self.overflows += 1
+        else:
+            self.slots[tail % self.capacity] = event
+            self.tail = tail + 1
+        if self.waiting:
+            self.wakeup.set()
+
+    def post(self, event):
+        """
+        Append an event from any thread other than the producer. Never blocks.
+
+        Args:
+            event (tuple): The event to append.
+        """
+        self.posted.append(event)
+        if self.waiting:
+            self.wakeup.set()
+
+    def drain(self, timeout=None):
+        """
+        Remove and return all the queued events, waiting for at least one.
+
+        Args:
+            timeout (float): Maximum time to wait in seconds, None to wait forever.
+
+        Returns:
+            list: The events in arrival order, empty if the timeout expired.
+        """
+        if self.tail == self.head and not self.overflow and not self.posted:
+            self.waiting = True
+            if self.tail == self.head and not self.overflow and not self.posted:
+                self.wakeup.wait(timeout)
+            self.wakeup.clear()
+            self.waiting = False
+
+        head, tail = self.head, self.tail
+        capacity, slots = self.capacity, self.slots
+        events = []
+        while head < tail:
+            index = head % capacity
+            events.append(slots[index])
+            slots[index] = None
+            head += 1
+        self.head = head
+        # the overflow only holds events newer than everything in the ring, so it is drained
+        # once the ring is known to be empty; otherwise it is left for the next call
+        if self.tail == head:
+            overflow = self.overflow
+            while overflow:
+                events.append(overflow.popleft())
+        posted = self.posted
+        while posted:
+            events.append(posted.popleft())
+        return events
+
+    def wake(self):
+        """
+        Wake up the consumer if it is waiting.
+        """
+        self.wakeup.set()
@@ -0,0 +1,142 @@
+# decode execution reports into compact ExecutionEvent records without per-message field allocations
+
+import quickfix as fix
+from order_manager import ExecutionEvent, EVENT_NEW, EVENT_FILL, EVENT_CANCEL, EVENT_REJECT, EVENT_CANCEL_REJECT
+
+SOH = '\x01'
+
+# ExecType (150) -> event kind, only the execution types the OrderManager handles
+EVENT_KINDS = {
+    fix.ExecType_NEW: EVENT_NEW,
+    fix.ExecType_PARTIAL_FILL: EVENT_FILL,
+    fix.ExecType_FILL: EVENT_FILL,
+    fix.ExecType_CANCELLED: EVENT_CANCEL,
+    fix.ExecType_REJECTED: EVENT_REJECT,
+}
+
+# tags read by decode_raw
+TAG_MSG_TYPE = '35'
+TAG_CL_ORD_ID = '11'
+TAG_ORIG_CL_ORD_ID = '41'
+TAG_SYMBOL = '55'
+TAG_SIDE = '54'
+TAG_EXEC_TYPE = '150'
+TAG_PRICE = '44'
+TAG_ORDER_QTY = '38'
+TAG_LAST_PX = '31'
+TAG_LAST_QTY = '32'
+RAW_TAGS = frozenset([TAG_MSG_TYPE, TAG_CL_ORD_ID, TAG_ORIG_CL_ORD_ID, TAG_SYMBOL, TAG_SIDE, TAG_EXEC_TYPE,
+                      TAG_PRICE, TAG_ORDER_QTY, TAG_LAST_PX, TAG_LAST_QTY])
+
+
+class ExecutionReportDecoder:
+    """
+    Decode execution reports using field holders allocated once and reused for every message.
+
+    The holders are not thread safe: a decoder must only be used by one thread, normally the
+    QuickFIX callback thread.
+    """
+    def __init__(self):
+        self.msg_type = fix.MsgType()
+        self.exec_type = fix.ExecType()
+        self.cl_ord_id = fix.ClOrdID()
+        self.orig_cl_ord_id = fix.OrigClOrdID()
+        self.symbol = fix.Symbol()
+        self.side = fix.Side()
+        self.price = fix.Price()
+        self.order_qty = fix.OrderQty()
+        self.last_px = fix.LastPx()
+        self.last_qty = fix.LastQty()
+        self.last_exec_type = None # ExecType of the last decoded message
+
+    def get_msg_type(self, message):
+        """
+        Returns:
+            str: The MsgType (35) of the message.
+        """
+        message.getHeader().getField(self.msg_type)
+        return self.msg_type.getValue()
+
+    def decode(self, message):
+        """
+        Decode an execution report.
+
+        Args:
+            message (Message): The execution report.
+
+        Returns:
+            ExecutionEvent: The decoded event, or None if the ExecType is not handled.
+        """
+        message.getField(self.exec_type)
+        exec_type = self.last_exec_type = self.exec_type.getValue()
+        kind = EVENT_KINDS.get(exec_type)
+        if kind is None:
+            return None
+
+        message.getField(self.cl_ord_id)
+        message.getField(self.symbol)
+        message.getField(self.side)
+        orig_cl_ord_id = price = quantity = None
+        if kind == EVENT_FILL:
+            message.getField(self.last_px)
+            message.getField(self.last_qty)
+            price = self.last_px.getValue()
+            quantity = self.last_qty.getValue()
+        elif kind == EVENT_NEW:
+            message.getField(self.order_qty)
+            quantity = self.order_qty.getValue()
+            price = 0.0 # market orders are acknowledged without a Price
+            if message.isSetField(self.price):
+                message.getField(self.price)
+                price = self.price.getValue()
+        elif kind == EVENT_CANCEL:
+            message.getField(self.orig_cl_ord_id)
+            orig_cl_ord_id = self.orig_cl_ord_id.getValue()
+        return ExecutionEvent(kind, self.cl_ord_id.getValue(), orig_cl_ord_id, self.symbol.getValue(),
+                              self.side.getValue(), price, quantity)
+
+    def decode_cancel_reject(self, message):
+        """
+        Decode an OrderCancelReject.
+
+        Args:
+            message (Message): The order cancel reject.
+
+        Returns:
+            ExecutionEvent: An EVENT_CANCEL_REJECT event with the ClOrdID of the cancel request and the OrigClOrdID of the order.
+        """
+        message.getField(self.cl_ord_id)
+        message.getField(self.orig_cl_ord_id)
+        return ExecutionEvent(EVENT_CANCEL_REJECT, self.cl_ord_id.getValue(), self.orig_cl_ord_id.getValue(),
+                              None, None, None, None)
+
+
+def decode_raw(raw):
+    """
+    Decode an execution report straight from its raw FIX string, without a quickfix Message.
+
+    Args:
+        raw (str): The SOH delimited message.
+
+    Returns:
+        ExecutionEvent: The decoded event, or None if it is not an execution report with a handled ExecType.
+    """
+    fields = {}
+    for field in raw.split(SOH):
+        tag, _, value = field.partition('=')
+        if tag in RAW_TAGS:
+            fields[tag] = value
+    if fields.get(TAG_MSG_TYPE) != fix.MsgType_ExecutionReport:
+        return None
+    kind = EVENT_KINDS.get(fields.get(TAG_EXEC_TYPE))
+    if kind is None:
+        return None
+    price = quantity = None
+    if kind == EVENT_FILL:
+        price = float(fields[TAG_LAST_PX])
+        quantity = float(fields[TAG_LAST_QTY])
+    elif kind == EVENT_NEW:
+        price = float(fields.get(TAG_PRICE, 0.0))
+        quantity = float(fields[TAG_ORDER_QTY])
+    return ExecutionEvent(kind, fields[TAG_CL_ORD_ID], fields.get(TAG_ORIG_CL_ORD_ID) if kind == EVENT_CANCEL else None,
+                          fields.get(TAG_SYMBOL), fields.get(TAG_SIDE), price, quantity)
@@ -1,180 +1,183 @@
 # handle the connection to the FIX server, logon, and message handling
 import quickfix as fix
-import quickfix42 as fix42
 import logging
-from order_manager import OrderManager
-from datetime import datetime
-from logger import CustomFormatter
-
-# Configure logging
-logger = logging.getLogger()
-handler = logging.StreamHandler()
-formatter = CustomFormatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-handler.setFormatter(formatter)
-logger.addHandler(handler)
-logger.setLevel(logging.INFO)
+import threading
+import time
+from order_manager import OrderManager, ExecutionEvent, EVENT_REJECT, EVENT_CANCEL_REJECT
+from execution_decoder import ExecutionReportDecoder
+from message_templates import ClOrdIDGenerator, MessageTemplates
+from latency import LatencyTracker
+from flow_control import InFlightWindow
+from metrics import MetricsRegistry, instrument_client
+from logger import log_message, ADMIN_LOGGER, APP_LOGGER, EXEC_LOGGER
+
+# Logging is configured by logger.configure_logging, messages are rendered lazily
+admin_log = logging.getLogger(ADMIN_LOGGER)
+app_log = logging.getLogger(APP_LOGGER)
+exec_log = logging.getLogger(EXEC_LOGGER)
 
 class Application(fix.Application):
-    def __init__(self, order_manager):
+    def __init__(self, order_manager, window=None, window_timeout=None, expiry_interval=1.0):
+        """
+        Args:
+            order_manager (OrderManager): The order state, fed with the execution reports.
+            window (InFlightWindow): Bounds the orders and cancels awaiting an answer, a default adaptive window if None.
+            window_timeout (float): Seconds a send waits for room in the window before it is rejected, None to wait forever.
+            expiry_interval (float): Seconds between two checks for unanswered requests in the window.
+        """
         super().__init__()
-        self.orderID = 0
         self.execID = 0
+        self.cl_ord_ids = ClOrdIDGenerator()
+        self.templates = MessageTemplates() # pre-built outgoing messages, one set per sending thread
+        self.latency = LatencyTracker() # per-order round-trip latencies
         self.order_manager = order_manager
+        self.logged_on = threading.Event() # set while the session is logged on
+        self.decoder = ExecutionReportDecoder() # only used on the QuickFIX callback thread
+        self.window = window or InFlightWindow()
+        self.window.on_expire = self.on_request_expired
+        self.window_timeout = window_timeout
+        self.expiry_interval = expiry_interval
+        self.cancel_requests = {} # ClOrdID of each cancel request in flight -> ClOrdID of the order to cancel
+        self.expiry_thread = None # started on the first logon, see _expire_requests
+        self.metrics = MetricsRegistry() # exported by metrics.MetricsServer or MetricsFileWriter
+        self.messages_received = self.metrics.counter('fix_messages_received_total', "FIX messages received, by MsgType", ('msg_type',))
+        self.messages_sent = self.metrics.counter('fix_messages_sent_total', "FIX messages sent, by MsgType", ('msg_type',))
+        instrument_client(self.metrics, self)
 
     def onCreate(self, sessionID):
-        logging.info(f"Session created: {sessionID}")
+        admin_log.info("Session created: %s", sessionID)
 
     def onLogon(self, sessionID):
-        logging.info(f"Logon: {sessionID}")
+        admin_log.info("Logon: %s", sessionID)
+        self.logged_on.set()
+        if self.expiry_thread is None:
+            self.expiry_thread = threading.Thread(target=self._expire_requests, name='WindowExpiry', daemon=True)
+            self.expiry_thread.start()
 
     def onLogout(self, sessionID):
-        logging.info(f"Logout: {sessionID}")
+        admin_log.info("Logout: %s", sessionID)
+        self.logged_on.clear()
+        # requests in flight will not be answered, as the sequence numbers are reset on logon
+        for cl_ord_id in self.window.clear():
+            self.on_request_expired(cl_ord_id)
+
+    def _expire_requests(self):
+        # requests are also expired as others enter or leave the window, this covers quiet periods
+        while True:
+            time.sleep(self.expiry_interval)
+            self.window.expire()
+
+    def wait_for_logon(self, timeout=None):
+        """
+        Block until the session is logged on.
+
+        Args:
+            timeout (float): Maximum time to wait in seconds, None to wait forever.
+
+        Returns:
+            bool: True if the session is logged on, False if the timeout expired.
+        """
+        return self.logged_on.wait(timeout)
 
     def toAdmin(self, message, sessionID):
         msgType = fix.MsgType()
         message.getHeader().getField(msgType)
-        logging.info(f"ToAdmin: {message}")
+        self.messages_sent.inc((msgType.getValue(),))
+        log_message(admin_log, "ToAdmin", message)
 
         if msgType.getValue() == fix.MsgType_Logon:
             message.setField(fix.ResetSeqNumFlag(True))
 
     def fromAdmin(self, message, sessionID):
-        logging.info(f"FromAdmin: {message}")
+        self.messages_received.inc((self.decoder.get_msg_type(message),))
+        log_message(admin_log, "FromAdmin", message)
 
     def toApp(self, message, sessionID):
-        logging.info(f"ToApp: {message}")
+        msgType = fix.MsgType() # called on the sending threads, so not the decoder's holder
+        message.getHeader().getField(msgType)
+        self.messages_sent.inc((msgType.getValue(),))
+        log_message(app_log, "ToApp", message)
 
     def fromApp(self, message, sessionID):
         self.onMessage(message, sessionID)
 
     def onMessage(self, message, sessionID):
-        msgType = fix.MsgType()
-        message.getHeader().getField(msgType)
-        if msgType.getValue() == fix.MsgType_ExecutionReport:
+        msg_type = self.decoder.get_msg_type(message)
+        self.messages_received.inc((msg_type,))
+        if msg_type == fix.MsgType_ExecutionReport:
             self.onExecutionReport(message)
-        elif msgType.getValue() == fix.MsgType_OrderCancelReject:
+        elif msg_type == fix.MsgType_OrderCancelReject:
             self.onOrderCancelReject(message)
         else:
-            logging.info(f"Other Messages: {message}")
+            log_message(app_log, "Other Messages", message)
 
     def onExecutionReport(self, message):
-        logging.info(f"Execution Report: {message}")
-
-        # Extract common fields from the message
-        symbol = fix.Symbol()
-        side = fix.Side()
-        cl_ord_id = fix.ClOrdID()
-
-        message.getField(symbol)
-        message.getField(side)
-        message.getField(cl_ord_id)
-        
-        # Check for AvgPx field
-        # avgPx = fix.AvgPx()
-        # if not message.isSetField(avgPx):
-        #     avgPx.setValue(0.0)  # Default value if not set by server
-        #     message.setField(avgPx)
-        #     logging.warning("AvgPx field was missing. Set to default value 0.0")
-
-        # # Check for Price field for limit orders
-        # if not message.isSetField(price):
-        #     price.setValue(0.0)  # Default value if not set by server
-        #     message.setField(price)
-        #     logging.warning("Price field was missing. Set to default value 0.0")
-
-        # cumQty = fix.CumQty()
-        # if not message.isSetField(cumQty):
-        #     cumQty.setValue(0)
-        #     message.setField(cumQty)
-        #     logging.warning("CumQty field was missing. Set to default value 0")
-
-        # execID = fix.ExecID()
-        # if not message.isSetField(execID):
-        #     execID.setValue('0')
-        #     message.setField(execID)
-        #     logging.warning("ExecID field was missing. Set to default value 0")
-
-        # Extract execution type from the message
-        exec_type = fix.ExecType()
-        message.getField(exec_type)
-
-        if exec_type.getValue() == fix.ExecType_NEW:
-
-            price = fix.Price()
-            quantity = fix.OrderQty()
-            message.getField(price)
-            message.getField(quantity)
-
-            # only add when executionreport NEW order response
-            self.order_manager.add_order(cl_ord_id.getString(), {
-                'symbol': symbol.getString(),
-                'side': side.getValue(),
-                # 'order_type': 'NEW',
-                'quantity': quantity.getValue(),
-                'price': price.getValue()
-            })
-            self.order_manager.orders_sent += 1 # increment only upon confirmation (35=8)
-            logging.info('ADDED NEW ORDER')
-
-        elif exec_type.getValue() == fix.ExecType_PARTIAL_FILL:
-
-            lastPx = fix.LastPx()
-            lastQty = fix.LastQty()
-            message.getField(lastPx)
-            message.getField(lastQty)
-
-            self.order_manager.update_order(cl_ord_id.getString(), symbol.getString(), lastPx.getValue(), lastQty.getValue(), side.getValue())
-            self.order_manager.update_position(symbol.getString(), lastPx.getValue(), lastQty.getValue(), side.getValue())
-            logging.info('UPDATED PARTIAL FILL')
-
-        elif exec_type.getValue() == fix.ExecType_FILL:
-
-            lastPx = fix.LastPx()
-            lastQty = fix.LastQty()
-            message.getField(lastPx)
-            message.getField(lastQty)
-
-            self.order_manager.update_order(cl_ord_id.getString(), symbol.getString(), lastPx.getValue(), lastQty.getValue(), side.getValue())
-            self.order_manager.update_position(symbol.getString(), lastPx.getValue(), lastQty.getValue(), side.getValue())
-            logging.info('UPDATED FILL')
-
-        elif exec_type.getValue() == fix.ExecType_CANCELLED:
-            orig_cl_ord_id = fix.OrigClOrdID()
-            message.getField(orig_cl_ord_id)
-
-            self.order_manager.remove_order(cl_ord_id.getValue())
-            self.order_manager.remove_order(orig_cl_ord_id.getString())
-            self.order_manager.orders_cancelled += 1 # increment only upon confirmation (35=9)
-            logging.info('REMOVED CANCELLED ORDER')
-
+        log_message(exec_log, "Execution Report", message)
+
+        # decode into a compact event, reusing the decoder's field holders
+        event = self.decoder.decode(message)
+        if event is None:
+            log_message(exec_log, "Message", message)
+            return
+
+        now = self.latency.clock()
+        self.window.release(event.cl_ord_id) # the ack of an order or cancel, or a reject
+        self.order_manager.on_execution(event)
+        exec_type = self.decoder.last_exec_type
+        if exec_type == fix.ExecType_NEW:
+            self.latency.on_ack(event.cl_ord_id, now)
+            exec_log.info('ADDED NEW ORDER')
+        elif exec_type == fix.ExecType_PARTIAL_FILL:
+            self.latency.on_fill(event.cl_ord_id, False, now)
+            exec_log.info('UPDATED PARTIAL FILL')
+        elif exec_type == fix.ExecType_FILL:
+            self.latency.on_fill(event.cl_ord_id, True, now)
+            exec_log.info('UPDATED FILL')
+        elif exec_type == fix.ExecType_CANCELLED:
+            self.cancel_requests.pop(event.cl_ord_id, None)
+            self.latency.on_cancel(event.orig_cl_ord_id, now)
+            exec_log.info('REMOVED CANCELLED ORDER')
         else:
-            logging.info(f"Message: {message}")
+            self.latency.on_reject(event.cl_ord_id)
+            log_message(exec_log, "Order Rejected", message, logging.WARNING)
 
         # self.order_manager.print_statistics() # uncomment this if you want to print after every execution
 
     def onOrderCancelReject(self, message):
-        logging.info(f"Order Cancel Reject: {message}")
-
-    def send_order(self, sessionID, symbol, side, order_type, quantity, price=None):
-        self.orderID += 1
-        uniqueClOrdID = f"{self.orderID}_{int(datetime.now().timestamp() * 1000)}"
-        clOrdID = fix.ClOrdID(uniqueClOrdID)
-        handlInst = fix.HandlInst(fix.HandlInst_MANUAL_ORDER_BEST_EXECUTION)
-        symbol_field = fix.Symbol(symbol)
-        side_field = fix.Side(side)
-        transactTime = fix.TransactTime()
-        ordType = fix.OrdType(order_type)
-
-        newOrderSingle = fix42.NewOrderSingle()
-        newOrderSingle.setField(clOrdID)
-        newOrderSingle.setField(handlInst)
-        newOrderSingle.setField(symbol_field)
-        newOrderSingle.setField(side_field)
-        newOrderSingle.setField(transactTime)
-        newOrderSingle.setField(ordType)
-        newOrderSingle.setField(fix.OrderQty(quantity))
-        newOrderSingle.setField(fix.TransactTime())
-        newOrderSingle.setField(fix.Text("New Order"))
+        log_message(exec_log, "Order Cancel Reject", message)
+        event = self.decoder.decode_cancel_reject(message)
+        self.window.release(event.cl_ord_id)
+        self.cancel_requests.pop(event.cl_ord_id, None)
+        self.order_manager.on_execution(event) # the order is no longer pending cancel
+
+    def on_request_expired(self, cl_ord_id):
+        """
+        Stop tracking an order or cancel request that was never answered. Called on the thread
+        that found it expired, so the rejection is handed to the OrderManager worker as an event;
+        for a cancel request, the order is no longer pending cancel.
+        """
+        app_log.warning("No answer to %s, dropped from the in-flight window", cl_ord_id)
+        orig_cl_ord_id = self.cancel_requests.pop(cl_ord_id, None)
+        if orig_cl_ord_id is not None:
+            self.order_manager.post_event(ExecutionEvent(EVENT_CANCEL_REJECT, cl_ord_id, orig_cl_ord_id, None, None, None, None))
+            return
+        self.order_manager.post_event(ExecutionEvent(EVENT_REJECT, cl_ord_id, None, None, None, None, None))
+        self.latency.on_reject(cl_ord_id)
+
+    def send_order(self, sessionID, symbol, side, order_type, quantity, price=None, cl_ord_id=None, reserved=False):
+        """
+        Send a NewOrderSingle, tracking it as in flight until it is acknowledged.
+        Waits while the in-flight window is full, up to window_timeout.
+
+        Args:
+            cl_ord_id (str): ClOrdID to use, from self.cl_ord_ids, for callers that must know it before
+                the order is sent; a new one is generated if None.
+            reserved (bool): The caller already entered cl_ord_id in the in-flight window, e.g. waiting
+                for room off an event loop, so the send does not wait.
+
+        Returns:
+            str: The ClOrdID of the order, or None if it was not sent.
+        """
         # message.setField(fix.TimeInForce('3'))
         # 0 = Day (or session)
         # 1 = Good Till Cancel (GTC)
@@ -182,29 +185,53 @@ class Application(fix.Application):
         # 3 = Immediate or Cancel (IOC)
 
         if order_type == fix.OrdType_LIMIT:
-            if price is not None:
-                newOrderSingle.setField(fix.Price(price))
-            else:
-                logging.error("Price must be set for limit orders")
-                return
-
-        fix.Session.sendToTarget(newOrderSingle, sessionID)
-
-    def send_cancel_order(self, sessionID, orig_cl_ord_id, symbol, side):
-        self.orderID += 1
-        origClOrdID = fix.OrigClOrdID(orig_cl_ord_id)
-        clOrdID = fix.ClOrdID(str(self.orderID))
-        symbol_field = fix.Symbol(symbol)
-        side_field = fix.Side(side)
-        transactTime = fix.TransactTime()
-
-        cancelRequest = fix42.OrderCancelRequest()
-        cancelRequest.setField(origClOrdID)
-        cancelRequest.setField(clOrdID)
-        cancelRequest.setField(symbol_field)
-        cancelRequest.setField(side_field)
-        cancelRequest.setField(transactTime)
-        cancelRequest.setField(fix.Text("Order Cancel Request"))
-
-        fix.Session.sendToTarget(cancelRequest, sessionID)
-        
\ No newline at end of file
+            if price is None:
+                app_log.error("Price must be set for limit orders")
+                if reserved:
+                    self.window.discard(cl_ord_id) # not sent, free the caller's slot
+                return None
+        else:
+            price = None
+
+        if cl_ord_id is None:
+            cl_ord_id = self.cl_ord_ids.next()
+        newOrderSingle = self.templates.new_order_single(cl_ord_id, symbol, side, order_type, quantity, price)
+        self.order_manager.submit_order(cl_ord_id)
+        if not reserved and not self.window.acquire(cl_ord_id, self.window_timeout):
+            app_log.warning("In-flight window full, order %s not sent", cl_ord_id)
+            self.order_manager.reject_order(cl_ord_id)
+            return None
+        self.latency.on_send(cl_ord_id, symbol)
+        if not fix.Session.sendToTarget(newOrderSingle, sessionID):
+            self.window.discard(cl_ord_id)
+            self.order_manager.reject_order(cl_ord_id)
+            self.latency.on_reject(cl_ord_id)
+            return None
+        return cl_ord_id
+
+    def send_cancel_order(self, sessionID, orig_cl_ord_id, symbol, side, cl_ord_id=None, reserved=False):
+        """
+        Send an OrderCancelRequest for an active order.
+        Waits while the in-flight window is full, up to window_timeout.
+        OrderManager.cancel_order also tracks the order as pending cancel.
+
+        Args:
+            cl_ord_id (str): ClOrdID of the cancel request, from self.cl_ord_ids; a new one is generated if None.
+            reserved (bool): The caller already entered cl_ord_id in the in-flight window.
+
+        Returns:
+            str: The ClOrdID of the cancel request, or None if it was not sent.
+        """
+        if cl_ord_id is None:
+            cl_ord_id = self.cl_ord_ids.next()
+        cancelRequest = self.templates.order_cancel_request(cl_ord_id, orig_cl_ord_id, symbol, side)
+        if not reserved and not self.window.acquire(cl_ord_id, self.window_timeout):
+            app_log.warning("In-flight window full, cancel of %s not sent", orig_cl_ord_id)
+            return None
+        self.latency.on_cancel_send(orig_cl_ord_id)
+        self.cancel_requests[cl_ord_id] = orig_cl_ord_id # until it is answered or expires
+        if not fix.Session.sendToTarget(cancelRequest, sessionID):
+            self.window.discard(cl_ord_id)
+            self.cancel_requests.pop(cl_ord_id, None)
+            return None
+        return cl_ord_id
@@ -0,0 +1,217 @@
+# bounded window of orders and cancels in flight, sized from the observed ack latency
+
+import time
+from threading import Condition, Lock
+
+
+class InFlightWindow:
+    """
+    Count the requests (orders and cancels) sent but not yet answered by the counterparty, and
+    make senders wait while the window is full.
+
+    The window size adapts to the ack latency with additive increase, multiplicative decrease
+    (AIMD): while the smoothed (EWMA) latency stays within `tolerance` times the lowest recent
+    latency (or below `target_latency` if given), the size grows by about one per window of acks;
+    when the latency rises above it the acceptor is queueing, so the size is cut by `decrease`,
+    at most once per round trip. The window therefore settles near the acceptor's capacity
+    instead of piling up requests in its queues.
+
+    Requests unanswered after `expiry` seconds are dropped from the window, shrinking it, and
+    reported to `on_expire`, so lost acks (e.g. across a disconnect) do not hold slots forever.
+    They are looked for whenever a request enters or leaves the window (only the oldest
+    requests are checked), and by expire(), to be called periodically for quiet periods.
+    """
+    def __init__(self, initial=64, minimum=4, maximum=4096, target_latency=None, tolerance=2.0,
+                 alpha=0.1, decrease=0.7, base_period=10.0, expiry=30.0, on_expire=None, clock=time.monotonic):
+        """
+        Args:
+            initial (int): Initial window size.
+            minimum (int): Smallest window size.
+            maximum (int): Largest window size.
+            target_latency (float): Ack latency in seconds above which the window shrinks, None to derive it from the lowest latency seen.
+            tolerance (float): Multiple of the lowest latency tolerated when target_latency is None.
+            alpha (float): Weight of a new sample in the EWMA latency.
+            decrease (float): Factor applied to the size when the latency is too high.
+            base_period (float): The lowest latency is taken over the last one to two periods of this many seconds.
+            expiry (float): Seconds after which an unanswered request is dropped.
+            on_expire (callable): Called with the key of each expired request, outside the lock.
+            clock (callable): Time source in seconds.
+        """
+        self.size = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.target_latency = target_latency
+        self.tolerance = tolerance
+        self.alpha = alpha
+        self.decrease = decrease
+        self.expiry = expiry
+        self.on_expire = on_expire
+        self.clock = clock
+        self.pending = {} # key -> send time, in send order
+        self.latency = None # EWMA ack latency in seconds
+        self.base_period = base_period
+        self.base_latency = None # lowest recent latency, windowed so a lasting slowdown is eventually accepted
+        self.base_candidate = None # lowest latency of the current period
+        self.base_reset = clock() + base_period
+        self.last_decrease = 0.0
+        self.expired = 0
+        self.lock = Lock()
+        self.space = Condition(self.lock) # notified when requests leave the window or it grows
+
+    @property
+    def capacity(self):
+        return int(self.size)
+
+    @property
+    def in_flight(self):
+        return len(self.pending)
+
+    def acquire(self, key, timeout=None):
+        """
+        Enter a request in the window, waiting for room if it is full.
+
+        Args:
+            key (str): The ClOrdID of the order or cancel request.
+            timeout (float): Maximum time to wait in seconds, None to wait forever, 0 to fail at once.
+
+        Returns:
+            bool: True if the request may be sent, False if the window stayed full.
+        """
+        return self.wait(timeout, key)
+
+    def wait(self, timeout=None, key=None):
+        """
+        Wait until the window has room, entering key in it if given.
+
+        Returns:
+            bool: False if the window stayed full until the timeout.
+        """
+        now = self.clock()
+        deadline = None if timeout is None else now + timeout
+        with self.space:
+            expired = self._expire(now)
+            while len(self.pending) >= int(self.size):
+                now = self.clock()
+                expired += self._expire(now)
+                if len(self.pending) < int(self.size):
+                    break
+                remaining = None if deadline is None else deadline - now
+                if remaining is not None and remaining <= 0:
+                    break
+                # wake up to expire the oldest request if nothing answers before
+                oldest = next(iter(self.pending.values()))
+                wait = max(oldest + self.expiry - now, 0.001)
+                self.space.wait(wait if remaining is None else min(wait, remaining))
+            room = len(self.pending) < int(self.size)
+            if room and key is not None:
+                self.pending[key] = self.clock()
+        self._report(expired)
+        return room
+
+    def release(self, key, now=None):
+        """
+        Remove an answered request from the window and adapt the size to its latency.
+        Unknown keys (already released or expired) are ignored.
+
+        Args:
+            key (str): The ClOrdID of the order or cancel request.
+            now (float): The time the answer was received.
+
+        Returns:
+            float: The request's latency in seconds, or None if it was not in the window.
+        """
+        with self.space:
+            sent = self.pending.pop(key, None)
+            if sent is None:
+                return None
+            if now is None:
+                now = self.clock()
+            latency = now - sent
+            capacity = int(self.size)
+            self._adapt(latency, now)
+            expired = self._expire(now)
+            if int(self.size) > capacity:
+                self.space.notify_all()
+            else:
+                self.space.notify()
+        self._report(expired)
+        return latency
+
+    def discard(self, key):
+        """
+        Remove a request that was not sent, without a latency sample.
+        """
+        with self.space:
+            if self.pending.pop(key, None) is not None:
+                self.space.notify()
+
+    def clear(self):
+        """
+        Empty the window, e.g. on logout, when the requests in flight will not be answered.
+        """
+        with self.space:
+            keys = list(self.pending)
+            self.pending.clear()
+            self.space.notify_all()
+        return keys
+
+    def expire(self, now=None):
+        """
+        Drop the requests unanswered for longer than the expiry and report them to on_expire.
+
+        Returns:
+            list: The expired keys.
+        """
+        with self.space:
+            expired = self._expire(self.clock() if now is None else now)
+        self._report(expired)
+        return expired
+
+    def _expire(self, now):
+        expired = []
+        pending = self.pending
+        for key, sent in pending.items(): # in send order, so stop at the first recent one
+            if now - sent < self.expiry:
+                break
+            expired.append(key)
+        if expired:
+            for key in expired:
+                del pending[key]
+            self.expired += len(expired)
+            self.size = max(self.minimum, self.size * self.decrease)
+            self.last_decrease = now
+            self.space.notify_all()
+        return expired
+
+    def _report(self, expired):
+        if self.on_expire is not None:
+            for key in expired:
+                self.on_expire(key)
+
+    def _adapt(self, latency, now):
+        self.latency = latency if self.latency is None else self.latency + self.alpha * (latency - self.latency)
+        if self.base_latency is None or latency < self.base_latency:
+            self.base_latency = latency
+        if self.base_candidate is None or latency < self.base_candidate:
+            self.base_candidate = latency
+        if now >= self.base_reset:
+            self.base_latency, self.base_candidate = self.base_candidate, None
+            self.base_reset = now + self.base_period
+        target = self.target_latency if self.target_latency is not None else self.base_latency * self.tolerance
+        if self.latency <= target:
+            self.size = min(self.maximum, self.size + 1.0 / self.size)
+        elif now - self.last_decrease >= self.latency:
+            self.size = max(self.minimum, self.size * self.decrease)
+            self.last_decrease = now
+
+    def summary(self):
+        """
+        Returns:
+            dict: The window size, requests in flight, EWMA latency and expired count.
+        """
+        with self.lock:
+            return {'size': int(self.size), 'in_flight': len(self.pending), 'latency': self.latency,
+                    'base_latency': self.base_latency, 'expired': self.expired}
+
+    def __repr__(self):
+        return f"InFlightWindow(size={int(self.size)}, in_flight={len(self.pending)})"
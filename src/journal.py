@@ -0,0 +1,262 @@
+# memory-mapped append-only journal of execution events, with snapshots for fast restart
+
+import glob
+import math
+import mmap
+import os
+import pickle
+import struct
+from threading import Thread
+from order_manager import ExecutionEvent, EVENT_NEW, EVENT_FILL, EVENT_CANCEL, EVENT_REJECT, EVENT_CANCEL_REJECT
+
+# record layout: length (uint32, written last so partial records are never read back), kind,
+# price, quantity and the lengths of cl_ord_id, orig_cl_ord_id, symbol and side, followed by
+# those strings. A zero length marks the end of the journal; each append writes one after its
+# record, so bytes left over from a torn write past the end are never read back.
+LENGTH = struct.Struct('<I')
+HEADER = struct.Struct('<IBddBBBB')
+KIND_CODES = {EVENT_NEW: 1, EVENT_FILL: 2, EVENT_CANCEL: 3, EVENT_REJECT: 4, EVENT_CANCEL_REJECT: 5}
+CODE_KINDS = {code: kind for kind, code in KIND_CODES.items()}
+NAN = float('nan')
+
+
+class Journal:
+    """
+    Append-only file of ExecutionEvents written through a memory map.
+
+    The file is grown (and remapped) in `chunk_size` steps, so an append is a struct.pack_into
+    and a slice assignment into the map. Writes reach the file when the OS flushes the pages,
+    or on flush().
+    """
+    def __init__(self, path, chunk_size=16 * 1024 * 1024):
+        self.path = path
+        self.chunk_size = chunk_size
+        open(path, 'ab').close() # create the file if needed
+        self.file = open(path, 'r+b')
+        size = os.fstat(self.file.fileno()).st_size
+        if size == 0:
+            size = chunk_size
+            self.file.truncate(size)
+        self.map = mmap.mmap(self.file.fileno(), size)
+        self.size = size
+        self.offset = 0
+        for offset, _ in self.read(): # position at the end of the valid records
+            self.offset = offset
+
+    def _grow(self, needed):
+        self.map.flush()
+        self.map.close()
+        self.size = max(self.size + self.chunk_size, needed)
+        self.file.truncate(self.size)
+        self.map = mmap.mmap(self.file.fileno(), self.size)
+
+    def append(self, event):
+        """
+        Append an execution event.
+
+        Args:
+            event (ExecutionEvent): The event to record.
+        """
+        kind, cl_ord_id, orig_cl_ord_id, symbol, side, price, quantity = event
+        cl_ord_id = cl_ord_id.encode() if cl_ord_id else b''
+        orig_cl_ord_id = orig_cl_ord_id.encode() if orig_cl_ord_id else b''
+        symbol = symbol.encode() if symbol else b''
+        side = side.encode() if side else b''
+        payload = cl_ord_id + orig_cl_ord_id + symbol + side
+        length = HEADER.size + len(payload)
+        offset = self.offset
+        if offset + length + LENGTH.size > self.size:
+            self._grow(offset + length + LENGTH.size)
+        LENGTH.pack_into(self.map, offset + length, 0) # the end, once this record is committed
+        HEADER.pack_into(self.map, offset, 0, KIND_CODES[kind], NAN if price is None else price,
+                         NAN if quantity is None else quantity,
+                         len(cl_ord_id), len(orig_cl_ord_id), len(symbol), len(side))
+        self.map[offset + HEADER.size:offset + length] = payload
+        LENGTH.pack_into(self.map, offset, length) # commit the record
+        self.offset = offset + length
+
+    def read(self, start=0):
+        """
+        Iterate over the records from the start offset, up to the end marker or the first record
+        that is not valid (an unknown kind, or a length out of range or not matching its strings).
+
+        Yields:
+            tuple: (offset after the record, ExecutionEvent).
+        """
+        mapped, offset = self.map, start
+        while offset + HEADER.size <= self.size:
+            length, code, price, quantity, *lengths = HEADER.unpack_from(mapped, offset)
+            if (length == 0 or code not in CODE_KINDS or length != HEADER.size + sum(lengths)
+                    or offset + length > self.size):
+                return
+            position = offset + HEADER.size
+            values = []
+            try:
+                for size in lengths:
+                    values.append(mapped[position:position + size].decode() or None)
+                    position += size
+            except UnicodeDecodeError:
+                return
+            cl_ord_id, orig_cl_ord_id, symbol, side = values
+            offset += length
+            yield offset, ExecutionEvent(CODE_KINDS[code], cl_ord_id, orig_cl_ord_id, symbol, side,
+                                         None if math.isnan(price) else price,
+                                         None if math.isnan(quantity) else quantity)
+
+    def truncate(self, offset):
+        """
+        Drop the records after the offset, so the next append overwrites them.
+        """
+        self.map[offset:self.offset] = bytes(self.offset - offset)
+        self.offset = offset
+
+    def flush(self):
+        self.map.flush()
+
+    def close(self):
+        self.map.flush()
+        self.map.close()
+        self.file.close()
+
+
+class StateJournal:
+    """
+    Journal the execution events applied by an OrderManager and snapshot its state every
+    `snapshot_every` events, so a restarted client rebuilds its exact book, positions and
+    statistics from the last snapshot plus the short tail of events written after it.
+
+    Snapshots hold the open orders, positions, statistics and counters, so their size does not
+    grow with the number of fills. The fills of the trade store are appended to their own
+    journal file, `orders.trades`, and the snapshot records how many of them it covers.
+
+    Each snapshot starts a new journal generation. The state is copied under the OrderManager's
+    lock, and pickled and fsynced by a writer thread; the older generations are deleted once the
+    snapshot is safely in place. Orders in flight (sent but not yet acknowledged) are not
+    journaled.
+    """
+    def __init__(self, directory, snapshot_every=10000):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.snapshot_every = snapshot_every
+        self.snapshot_path = os.path.join(directory, 'orders.snapshot')
+        self.trades_path = os.path.join(directory, 'orders.trades')
+        self.generation = 0
+        self.journal = None
+        self.trades = None # journal of the fills, written by the snapshot writer
+        self.fills_written = 0 # fills of the trade store handed to the snapshot writer
+        self.writer = None # thread writing the last snapshot
+        self.events_since_snapshot = 0
+
+    def _journal_path(self, generation):
+        return os.path.join(self.directory, f"orders.{generation}.journal")
+
+    def _generations(self):
+        paths = glob.glob(os.path.join(self.directory, 'orders.*.journal'))
+        return sorted(int(os.path.basename(path).split('.')[1]) for path in paths)
+
+    def recover(self, order_manager):
+        """
+        Rebuild the OrderManager's state from the snapshot, the trades file and the journal,
+        then start journaling.
+
+        Args:
+            order_manager (OrderManager): A new OrderManager, before it is started.
+
+        Returns:
+            int: The number of journaled events replayed on top of the snapshot.
+        """
+        fill_count = 0
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, 'rb') as snapshot:
+                state = pickle.load(snapshot)
+            self.generation = state.pop('generation')
+            fill_count = state.pop('fill_count')
+            order_manager.restore_state(state)
+
+        replayed = 0
+        with order_manager.lock:
+            # the fills up to the snapshot; any later ones come from a snapshot that was not
+            # completed, and are replayed from the journal below
+            self.trades = Journal(self.trades_path)
+            trade_data, end = order_manager.trade_data, 0
+            for offset, fill in self.trades.read():
+                if len(trade_data) == fill_count:
+                    break
+                trade_data.append(fill.symbol, fill.price, fill.quantity, fill.side)
+                end = offset
+            self.trades.truncate(end)
+            self.fills_written = len(trade_data)
+
+            # the generations since the snapshot's, more than one if the process stopped while
+            # the next snapshot was written
+            generations = [generation for generation in self._generations() if generation >= self.generation]
+            for generation in generations:
+                journal = Journal(self._journal_path(generation))
+                for _, event in journal.read():
+                    if event.kind == EVENT_REJECT: # only rejects of orders in flight are journaled
+                        order_manager.pending_orders.add(event.cl_ord_id)
+                    order_manager.apply_event(event)
+                    replayed += 1
+                journal.close()
+        if generations:
+            self.generation = generations[-1]
+        self.journal = Journal(self._journal_path(self.generation))
+        self.events_since_snapshot = replayed
+        order_manager.journal = self
+        return replayed
+
+    def record(self, order_manager, event):
+        """
+        Journal an event. Called by the OrderManager with its lock held, before applying it,
+        so a snapshot taken here holds exactly the events journaled so far.
+        """
+        if self.events_since_snapshot >= self.snapshot_every and (self.writer is None or not self.writer.is_alive()):
+            self.snapshot(order_manager)
+        self.journal.append(event)
+        self.events_since_snapshot += 1
+
+    def snapshot(self, order_manager):
+        """
+        Copy the OrderManager's state and the fills since the last snapshot, start a new journal
+        generation and hand the copy to a writer thread. Must be called with the OrderManager's
+        lock held, between two events.
+        """
+        state = order_manager.export_state()
+        trade_data = order_manager.trade_data
+        fills = [trade_data[index] for index in range(self.fills_written, len(trade_data))]
+        self.fills_written = len(trade_data)
+        state['fill_count'] = self.fills_written
+
+        journal = self.journal
+        self.generation += 1
+        state['generation'] = self.generation
+        self.journal = Journal(self._journal_path(self.generation))
+        self.events_since_snapshot = 0
+        self.writer = Thread(target=self._write_snapshot, args=(state, fills, journal), name='StateJournal', daemon=True)
+        self.writer.start()
+
+    def _write_snapshot(self, state, fills, journal):
+        journal.close()
+        trades = self.trades
+        for fill in fills:
+            trades.append(ExecutionEvent(EVENT_FILL, None, None, fill['symbol'], str(fill['side']), fill['price'], fill['quantity']))
+        trades.flush()
+
+        temporary = self.snapshot_path + '.tmp'
+        with open(temporary, 'wb') as snapshot:
+            pickle.dump(state, snapshot, protocol=pickle.HIGHEST_PROTOCOL)
+            snapshot.flush()
+            os.fsync(snapshot.fileno())
+        os.replace(temporary, self.snapshot_path)
+
+        for generation in self._generations():
+            if generation < state['generation']:
+                os.remove(self._journal_path(generation))
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.join()
+        if self.journal is not None:
+            self.journal.close()
+        if self.trades is not None:
+            self.trades.close()
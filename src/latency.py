@@ -0,0 +1,183 @@
+# per-order round-trip latency tracking with log-bucketed (HDR-style) histograms
+
+import threading
+import time
+from collections import OrderedDict
+
+# latency stages, each measured between two events of an order
+STAGE_ACK = 'ack' # send -> NEW ack
+STAGE_FIRST_FILL = 'first_fill' # NEW ack -> first (partial) fill
+STAGE_FINAL_FILL = 'final_fill' # NEW ack -> final fill
+STAGE_CANCEL = 'cancel' # cancel request sent -> CANCELLED
+STAGES = (STAGE_ACK, STAGE_FIRST_FILL, STAGE_FINAL_FILL, STAGE_CANCEL)
+ALL_SYMBOLS = '*'
+
+# indexes in the per-order timestamp records
+SYMBOL, SENT, ACKED, FIRST_FILL, CANCEL_SENT = range(5)
+
+
+class LatencyHistogram:
+    """
+    Histogram of latencies in nanoseconds with log-linear buckets.
+
+    Values below 2**precision_bits are counted exactly; above, each power of two is split in
+    2**(precision_bits - 1) sub-buckets, which bounds the relative error to 2**(1 - precision_bits)
+    (about 3% with the default 6 bits) with a constant memory footprint.
+    """
+    def __init__(self, precision_bits=6):
+        self.precision_bits = precision_bits
+        self.counts = {} # bucket index -> count
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def bucket_index(self, value):
+        p = self.precision_bits
+        if value < (1 << p):
+            return value
+        shift = value.bit_length() - p
+        return (1 << p) + (shift - 1) * (1 << (p - 1)) + (value >> shift) - (1 << (p - 1))
+
+    def bucket_upper_bound(self, index):
+        p = self.precision_bits
+        if index < (1 << p):
+            return index
+        shift, offset = divmod(index - (1 << p), 1 << (p - 1))
+        shift += 1
+        return (((1 << (p - 1)) + offset + 1) << shift) - 1
+
+    def record(self, value):
+        """
+        Args:
+            value (int): The latency in nanoseconds.
+        """
+        value = max(0, int(value))
+        index = self.bucket_index(value)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def percentile(self, percent):
+        """
+        Args:
+            percent (float): The percentile, e.g. 99.9.
+
+        Returns:
+            int: The latency in nanoseconds at the percentile (bucket upper bound), or None if empty.
+        """
+        if not self.count:
+            return None
+        target = max(1, -(-self.count * percent // 100))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= target:
+                return min(self.bucket_upper_bound(index), self.max)
+        return self.max
+
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+
+class LatencyTracker:
+    """
+    Capture the send, ack, fill and cancel timestamps of each order, keyed by ClOrdID, and
+    record the latency of every stage per symbol (and for all symbols) in histograms.
+
+    At most `capacity` orders are tracked; when full, the oldest order is evicted. Orders are
+    dropped as soon as they are terminal.
+    """
+    def __init__(self, capacity=100000, clock=time.perf_counter_ns):
+        self.capacity = capacity
+        self.clock = clock
+        self.orders = OrderedDict() # cl_ord_id -> [symbol, sent, acked, first_fill, cancel_sent]
+        self.histograms = {} # (symbol, stage) -> LatencyHistogram
+        self.evicted = 0
+        self.lock = threading.Lock()
+
+    def _record(self, symbol, stage, latency):
+        for key in ((symbol, stage), (ALL_SYMBOLS, stage)):
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = LatencyHistogram()
+            histogram.record(latency)
+
+    def on_send(self, cl_ord_id, symbol, now=None):
+        now = self.clock() if now is None else now
+        with self.lock:
+            if len(self.orders) >= self.capacity:
+                self.orders.popitem(last=False)
+                self.evicted += 1
+            self.orders[cl_ord_id] = [symbol, now, None, None, None]
+
+    def on_ack(self, cl_ord_id, now=None):
+        now = self.clock() if now is None else now
+        with self.lock:
+            order = self.orders.get(cl_ord_id)
+            if order is not None and order[ACKED] is None:
+                order[ACKED] = now
+                self._record(order[SYMBOL], STAGE_ACK, now - order[SENT])
+
+    def on_fill(self, cl_ord_id, final, now=None):
+        now = self.clock() if now is None else now
+        with self.lock:
+            order = self.orders.pop(cl_ord_id, None) if final else self.orders.get(cl_ord_id)
+            if order is None or order[ACKED] is None:
+                return
+            if order[FIRST_FILL] is None:
+                order[FIRST_FILL] = now
+                self._record(order[SYMBOL], STAGE_FIRST_FILL, now - order[ACKED])
+            if final:
+                self._record(order[SYMBOL], STAGE_FINAL_FILL, now - order[ACKED])
+
+    def on_cancel_send(self, cl_ord_id, now=None):
+        now = self.clock() if now is None else now
+        with self.lock:
+            order = self.orders.get(cl_ord_id)
+            if order is not None and order[CANCEL_SENT] is None:
+                order[CANCEL_SENT] = now
+
+    def on_cancel(self, cl_ord_id, now=None):
+        now = self.clock() if now is None else now
+        with self.lock:
+            order = self.orders.pop(cl_ord_id, None)
+            if order is not None and order[CANCEL_SENT] is not None:
+                self._record(order[SYMBOL], STAGE_CANCEL, now - order[CANCEL_SENT])
+
+    def on_reject(self, cl_ord_id):
+        with self.lock:
+            self.orders.pop(cl_ord_id, None)
+
+    def summary(self):
+        """
+        Returns:
+            dict: (symbol, stage) -> dict of count, p50, p99, p99.9 and max in microseconds.
+        """
+        with self.lock:
+            summary = {}
+            for key in sorted(self.histograms):
+                histogram = self.histograms[key]
+                summary[key] = {
+                    'count': histogram.count,
+                    'p50': histogram.percentile(50) / 1000,
+                    'p99': histogram.percentile(99) / 1000,
+                    'p99.9': histogram.percentile(99.9) / 1000,
+                    'max': histogram.max / 1000
+                }
+            return summary
+
+    def dump(self):
+        """
+        Print the latency percentiles of every symbol and stage, in microseconds.
+        """
+        print(f"{'Symbol':<8} {'Stage':<12} {'Count':>8} {'p50 us':>10} {'p99 us':>10} {'p99.9 us':>10} {'max us':>10}")
+        for (symbol, stage), stats in self.summary().items():
+            print(f"{symbol:<8} {stage:<12} {stats['count']:>8} {stats['p50']:>10.1f} {stats['p99']:>10.1f} "
+                  f"{stats['p99.9']:>10.1f} {stats['max']:>10.1f}")
+        if self.evicted:
+            print(f"Orders evicted from the latency tracker: {self.evicted}")
@@ -0,0 +1,177 @@
+# offline statistics from the QuickFIX message logs, without building quickfix messages
+
+import argparse
+import glob
+import mmap
+import multiprocessing
+import os
+from statistics import StatisticsAccumulator, print_total_volume, print_pnl
+
+SOH = b'\x01'
+EXECUTION_REPORT = b'\x0135=8\x01'
+FILL_EXEC_TYPES = (b'1', b'2') # PARTIAL_FILL, FILL
+BUY = b'1'
+SELLS = (b'2', b'5') # SELL, SELL SHORT
+
+
+def message_logs(paths):
+    """
+    Expand directories into the QuickFIX message logs they contain.
+
+    Args:
+        paths (list): Log files or FileLogPath directories.
+
+    Returns:
+        list: The message log files.
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, '*.messages*.log'))))
+        else:
+            files.append(path)
+    return files
+
+
+def split_chunks(path, chunk_size):
+    """
+    Split a file into byte ranges of about chunk_size; the ranges are aligned to lines by the workers.
+
+    Returns:
+        list: (path, start, end) tuples.
+    """
+    size = os.path.getsize(path)
+    if chunk_size is None or chunk_size <= 0:
+        return [(path, 0, size)]
+    return [(path, start, min(start + chunk_size, size)) for start in range(0, size, chunk_size)] or [(path, 0, 0)]
+
+
+def analyze_chunk(task):
+    """
+    Rebuild the statistics and positions from the fills in the lines starting in [start, end).
+
+    Args:
+        task (tuple): (path, start, end).
+
+    Returns:
+        tuple: (StatisticsAccumulator, positions as symbol -> [position, total_cost], execution reports seen).
+    """
+    path, start, end = task
+    stats = StatisticsAccumulator()
+    positions = {}
+    reports = 0
+    if end <= start:
+        return stats, positions, reports
+    with open(path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        if start > 0: # begin at the first line starting in the range
+            start = buffer.find(b'\n', start - 1) + 1
+            if start == 0:
+                return stats, positions, reports
+        position = start
+        while True:
+            index = buffer.find(EXECUTION_REPORT, position)
+            if index < 0:
+                break
+            line_start = buffer.rfind(b'\n', 0, index) + 1
+            if line_start >= end:
+                break
+            line_end = buffer.find(b'\n', index)
+            if line_end < 0:
+                line_end = len(buffer)
+            position = line_end
+            reports += 1
+
+            exec_type = symbol = side = last_px = last_qty = None
+            for field in buffer[index + 1:line_end].split(SOH):
+                tag, _, value = field.partition(b'=')
+                if tag == b'150':
+                    exec_type = value
+                elif tag == b'55':
+                    symbol = value
+                elif tag == b'54':
+                    side = value
+                elif tag == b'31':
+                    last_px = value
+                elif tag == b'32':
+                    last_qty = value
+            if exec_type not in FILL_EXEC_TYPES or last_px is None or last_qty is None:
+                continue
+
+            symbol = symbol.decode()
+            price = float(last_px)
+            quantity = float(last_qty)
+            stats.add_fill(symbol, price, quantity, side)
+            position_cost = positions.setdefault(symbol, [0, 0])
+            if side == BUY:
+                position_cost[0] += quantity
+                position_cost[1] += price * quantity
+            elif side in SELLS:
+                position_cost[0] -= quantity
+                position_cost[1] -= price * quantity
+    return stats, positions, reports
+
+
+def analyze(paths, processes=1, chunk_size=None):
+    """
+    Rebuild the total volume, PnL, VWAP and positions from QuickFIX message logs.
+
+    Every fill in the logs is accounted, whereas the live OrderManager only records fills of
+    orders it saw acknowledged; the two agree whenever every filled order was acknowledged.
+    With several chunks the per-chunk sums are merged, so results may differ from a single
+    pass in the last floating point digits.
+
+    Args:
+        paths (list): Message log files or FileLogPath directories.
+        processes (int): Number of worker processes, 1 to analyze in this process.
+        chunk_size (int): Split files in chunks of about this many bytes, None for one chunk per file.
+
+    Returns:
+        dict: 'total_volume', 'pnl', 'vwap', 'positions' and 'execution_reports'.
+    """
+    tasks = [chunk for path in message_logs(paths) for chunk in split_chunks(path, chunk_size)]
+    if processes > 1 and len(tasks) > 1:
+        with multiprocessing.Pool(processes) as pool:
+            results = pool.map(analyze_chunk, tasks)
+    else:
+        results = [analyze_chunk(task) for task in tasks]
+
+    stats = StatisticsAccumulator()
+    totals = {}
+    reports = 0
+    for chunk_stats, chunk_positions, chunk_reports in results:
+        stats.merge(chunk_stats)
+        for symbol, (position, total_cost) in chunk_positions.items():
+            total = totals.setdefault(symbol, [0, 0])
+            total[0] += position
+            total[1] += total_cost
+        reports += chunk_reports
+
+    result = stats.snapshot()
+    result['positions'] = {
+        symbol: {'position': position, 'total_cost': total_cost,
+                 'avg_price': abs(total_cost / position) if position != 0 else None}
+        for symbol, (position, total_cost) in totals.items()
+    }
+    result['execution_reports'] = reports
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild trading statistics from QuickFIX message logs")
+    parser.add_argument('paths', nargs='*', default=["log"], help="message log files or FileLogPath directories")
+    parser.add_argument('--processes', type=int, default=1)
+    parser.add_argument('--chunk-mb', type=int, default=0, help="split the logs in chunks of this many MB, 0 for one chunk per file")
+    args = parser.parse_args()
+
+    result = analyze(args.paths, args.processes, args.chunk_mb * 1024 * 1024 or None)
+    print_total_volume(result['total_volume'])
+    print_pnl(result['pnl'])
+    print("Execution Reports: ", result['execution_reports'])
+    print("Total Volume: ", result['total_volume'])
+    print("PNL: ", result['pnl'])
+    print("VWAP: ", result['vwap'])
+    print("Positions: ", result['positions'])
+
+
+if __name__ == "__main__":
+    main()
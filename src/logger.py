@@ -1,12 +1,187 @@
 # src/custom_formatter.py
 
 import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+import quickfix as fix
+
+# per category loggers of the FIX application
+ADMIN_LOGGER = 'fix.admin' # session level messages (logon, heartbeats, ...)
+APP_LOGGER = 'fix.app' # application messages sent and received
+EXEC_LOGGER = 'fix.exec' # execution reports and order state changes
 
 class CustomFormatter(logging.Formatter):
     GREEN = '\033[92m'
     RESET = '\033[0m'
-    
+    HIGHLIGHTED = frozenset(["REMOVED CANCELLED ORDER", "ADDED NEW ORDER", "UPDATED PARTIAL FILL", "UPDATED FILL"])
+
     def format(self, record):
-        if record.msg in ["REMOVED CANCELLED ORDER", "ADDED NEW ORDER", "UPDATED PARTIAL FILL", "UPDATED FILL"]:
+        if type(record.msg) is str and record.msg in self.HIGHLIGHTED:
+            # color a copy, so other handlers of the record see the plain message
+            record = logging.makeLogRecord(record.__dict__)
             record.msg = f"{self.GREEN}{record.msg}{self.RESET}"
         return super().format(record)
+
+
+class RawMessage:
+    """
+    Raw FIX string of a message, rendered only when a log record is actually formatted.
+
+    The string is taken with message.toString(), so the record stays valid even if the
+    message object is reused (e.g. a send template) before the log record is handled.
+    """
+    __slots__ = ('raw',)
+
+    def __init__(self, raw):
+        self.raw = raw
+
+    def __str__(self):
+        return self.raw
+
+    @property
+    def msg_type(self):
+        start = self.raw.find('\x0135=')
+        if start < 0:
+            return None
+        start += 4
+        return self.raw[start:self.raw.find('\x01', start)]
+
+
+def log_message(logger, prefix, message, level=logging.INFO):
+    """
+    Log a FIX message, skipping the string conversion entirely when the level is disabled or
+    the message is sampled out. The sampling filters of the logger are applied here, on the
+    MsgType read from the header, so only the messages kept are converted to a string.
+
+    Args:
+        logger (Logger): The category logger.
+        prefix (str): Description of the message, e.g. 'ToApp'.
+        message (Message): The quickfix message.
+        level (int): The logging level.
+    """
+    if not logger.isEnabledFor(level):
+        return
+    samplers = [f for f in logger.filters if isinstance(f, SamplingFilter)]
+    if samplers:
+        msgType = fix.MsgType()
+        message.getHeader().getField(msgType)
+        for sampler in samplers:
+            if not sampler.keep(msgType.getValue()):
+                return
+    logger.log(level, "%s: %s", prefix, RawMessage(message.toString()), extra={'sampled': True})
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Only let through one in every N records for the configured message types.
+
+    log_message applies it before converting the message to a string; records logged
+    otherwise with a RawMessage argument are sampled when they are filtered.
+    """
+    def __init__(self, rates):
+        """
+        Args:
+            rates (dict): MsgType -> N, e.g. {'0': 100} to log one heartbeat in a hundred.
+        """
+        super().__init__()
+        self.rates = rates
+        self.counts = dict.fromkeys(rates, 0)
+
+    def keep(self, msg_type):
+        """
+        Count a message of the given type and decide whether it is logged.
+
+        Returns:
+            bool: True for one in every N messages of a sampled type, and for other types.
+        """
+        rate = self.rates.get(msg_type)
+        if rate is None:
+            return True
+        count = self.counts[msg_type]
+        self.counts[msg_type] = count + 1
+        return count % rate == 0
+
+    def filter(self, record):
+        if getattr(record, 'sampled', False): # already sampled by log_message
+            return True
+        args = record.args
+        if not args or not isinstance(args[-1], RawMessage):
+            return True
+        return self.keep(args[-1].msg_type)
+
+
+class RawDumpHandler(logging.Handler):
+    """
+    Append the raw FIX string of every logged message to a file, one message per line.
+    """
+    def __init__(self, filename):
+        super().__init__()
+        self.stream = open(filename, 'ab')
+
+    def emit(self, record):
+        args = record.args
+        if args and isinstance(args[-1], RawMessage):
+            self.stream.write(args[-1].raw.encode('ascii', 'replace') + b'\n')
+
+    def flush(self):
+        self.stream.flush()
+
+    def close(self):
+        self.stream.close()
+        super().close()
+
+
+class LazyQueueHandler(QueueHandler):
+    """
+    Queue the record without formatting it, so the message is rendered by the listener thread.
+    """
+    def prepare(self, record):
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def configure_logging(level=logging.INFO, async_mode=True, levels=None, sample=None, raw_dump=None,
+                      fmt='%(asctime)s - %(name)s - %(levelname)s - %(message)s'):
+    """
+    Configure the root logger and the FIX category loggers.
+
+    Args:
+        level (int): Level of the root logger.
+        async_mode (bool): Hand the records to a queue and format and write them on a listener thread.
+        levels (dict): Level per category logger name (ADMIN_LOGGER, APP_LOGGER, EXEC_LOGGER).
+        sample (dict): MsgType -> N, log only one in every N messages of that type.
+        raw_dump (str): File to append the raw FIX strings of the logged messages to.
+        fmt (str): The log record format.
+
+    Returns:
+        QueueListener: The started listener in async mode, to be stopped at exit, else None.
+    """
+    handlers = []
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(CustomFormatter(fmt))
+    handlers.append(stream_handler)
+    if raw_dump is not None:
+        handlers.append(RawDumpHandler(raw_dump))
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    listener = None
+    if async_mode:
+        records = queue.SimpleQueue()
+        root.addHandler(LazyQueueHandler(records))
+        listener = QueueListener(records, *handlers, respect_handler_level=True)
+        listener.start()
+    else:
+        for handler in handlers:
+            root.addHandler(handler)
+
+    sampling_filter = SamplingFilter(sample) if sample else None
+    for name in (ADMIN_LOGGER, APP_LOGGER, EXEC_LOGGER):
+        category = logging.getLogger(name)
+        if levels and name in levels:
+            category.setLevel(levels[name])
+        if sampling_filter is not None:
+            category.addFilter(sampling_filter)
+    return listener
@@ -1,35 +1,63 @@
 import logging
-import time
 from threading import Thread
 from fix_client import Application
 from order_manager import OrderManager
+from logger import configure_logging
+from journal import StateJournal
+from dictionary_builder import ensure_dictionary
+from metrics import MetricsServer, MetricsFileWriter
+from scenario import Scenario
 import quickfix as fix
 
-def main():
-    logging.basicConfig(level=logging.INFO)
+def run_session(settings, symbols, order_count, duration_minutes, logon_timeout=30, fill_timeout=30, idle_timeout=2,
+                journal_directory=None, metrics_port=None, metrics_file=None, scenario=None):
+    """
+    Run the order and cancellation phases on the first session of the settings.
 
-    # Configuration
-    config_file = "../config/fix.cfg"
-    symbols = ["MSFT", "AAPL", "BAC"]
-    order_count = 1000 # 10
-    duration_minutes = 5 #0.2 #1 # 5
+    Args:
+        settings (SessionSettings): The FIX session settings.
+        symbols (list): List of symbols to trade.
+        order_count (int): The number of orders to send.
+        duration_minutes (int): The duration in minutes over which to send the orders and the cancellations.
+        logon_timeout (float): Seconds to wait for the session to logon.
+        fill_timeout (float): Seconds to wait for orders to be filled or cancelled by the server.
+        idle_timeout (float): Seconds without execution reports after which unfilled orders are considered resting.
+        journal_directory (str): Directory of the order journal, to recover the order state of a previous run and persist it.
+        metrics_port (int): Serve the Prometheus metrics on http://127.0.0.1:<port>/metrics.
+        metrics_file (str): Write the Prometheus metrics to this file every 10 seconds.
+        scenario (Scenario): Replay these orders instead of generating order_count random orders.
 
+    Returns:
+        tuple: The (OrderManager, Application) of the session, or None if the session did not logon.
+    """
     # Initialize the OrderManager
     order_manager = OrderManager()
+    journal = None
+    if journal_directory is not None:
+        journal = StateJournal(journal_directory)
+        replayed = journal.recover(order_manager)
+        logging.info(f"Recovered the order state from {journal_directory}, replayed {replayed} journaled events")
 
     # Initialize the FIX application with the OrderManager
     application = Application(order_manager)
-    settings = fix.SessionSettings(config_file)
     store_factory = fix.FileStoreFactory(settings)
     log_factory = fix.FileLogFactory(settings)
     initiator = fix.SocketInitiator(application, store_factory, settings, log_factory)
+    exporters = []
+    if metrics_port is not None:
+        exporters.append(MetricsServer(application.metrics, port=metrics_port).start())
+    if metrics_file is not None:
+        exporters.append(MetricsFileWriter(application.metrics, metrics_file).start())
 
     try:
-        # Start the FIX session
+        # Start the worker applying the execution reports, then the FIX session
+        order_manager.start()
         initiator.start()
-        
+
         # Wait for the session to logon
-        time.sleep(5)
+        if not application.wait_for_logon(logon_timeout):
+            logging.error(f"Session did not logon within {logon_timeout} seconds")
+            return None
 
         # Get SenderCompID and TargetCompID from settings
         session = settings.get().getSessions()[0]
@@ -38,27 +66,60 @@ def main():
 
         # Create the session ID
         session_id = fix.SessionID("FIX.4.2", sender_comp_id, target_comp_id)
-        
-        # Generating random orders
-        generator_thread = Thread(target=order_manager.generate_random_orders, args=(application, session_id, symbols, order_count, duration_minutes))
+
+        # Generating random orders, or replaying a seeded scenario
+        if scenario is not None:
+            generator_thread = Thread(target=order_manager.replay_orders, args=(application, session_id, scenario))
+        else:
+            generator_thread = Thread(target=order_manager.generate_random_orders, args=(application, session_id, symbols, order_count, duration_minutes))
         generator_thread.start()
         generator_thread.join()
 
-        time.sleep(30) # wait for orders to be filled by the server
+        order_manager.wait_until_drained(fill_timeout, idle=idle_timeout) # wait for orders to be filled by the server
         order_manager.print_statistics()
 
-        # Generating random cancellations for any active orders unfilled
-        cancel_thread = Thread(target=order_manager.generate_random_cancellations, args=(application, session_id, duration_minutes))
-        cancel_thread.start()
-        cancel_thread.join()
-        time.sleep(30) # wait for orders to be in the server
+        # Cancel every active order left unfilled, and wait for the cancellations to be confirmed by the server
+        result = order_manager.mass_cancel(application, session_id, timeout=fill_timeout)
+        logging.info(f"Mass cancel: {result}")
 
         # Print statistics after all orders are processed
         order_manager.print_statistics()
-
+        recalculated, matching = order_manager.reconcile_statistics()
+        if not matching:
+            logging.warning(f"Running statistics differ from the {len(order_manager.trade_data)} recorded fills: {recalculated}")
+        application.latency.dump()
+        logging.info(f"In-flight window: {application.window.summary()}")
+        return order_manager, application
 
     finally:
         initiator.stop()
+        order_manager.stop()
+        for exporter in exporters:
+            exporter.stop()
+        if journal is not None:
+            journal.close()
+
+def main():
+    # Asynchronous logging, with heartbeats sampled; see logger.configure_logging for the options
+    log_listener = configure_logging(logging.INFO, async_mode=True, sample={fix.MsgType_Heartbeat: 10})
+
+    # Configuration
+    config_file = "../config/fix.cfg"
+    symbols = ["MSFT", "AAPL", "BAC"]
+    order_count = 1000 # 10
+    duration_minutes = 5 #0.2 #1 # 5
+    journal_directory = None # e.g. "journal" to persist the order state and recover it on restart
+    metrics_port = None # e.g. 8000 to serve Prometheus metrics on http://127.0.0.1:8000/metrics
+    metrics_file = None # e.g. "metrics.prom" to write them to a file every 10 seconds
+    scenario_file = None # e.g. "scenario.npz" from scenario.py, to replay a seeded scenario instead of random orders
+
+    try:
+        ensure_dictionary() # rebuild spec/FIX42_trimmed.xml if spec/FIX42.xml changed
+        scenario = Scenario.load(scenario_file) if scenario_file is not None else None
+        run_session(fix.SessionSettings(config_file), symbols, order_count, duration_minutes, journal_directory=journal_directory,
+                    metrics_port=metrics_port, metrics_file=metrics_file, scenario=scenario)
+    finally:
+        log_listener.stop()
 
 if __name__ == "__main__":
     main()
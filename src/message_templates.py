@@ -0,0 +1,124 @@
+# pre-built outgoing messages and cheap ClOrdID generation for the send path
+
+import itertools
+import threading
+import time
+import quickfix as fix
+import quickfix42 as fix42
+
+BASE36_DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+
+
+def to_base36(number):
+    digits = []
+    while True:
+        number, digit = divmod(number, 36)
+        digits.append(BASE36_DIGITS[digit])
+        if number == 0:
+            return ''.join(reversed(digits))
+
+
+class ClOrdIDGenerator:
+    """
+    Generate unique ClOrdIDs as '<prefix>_<sequence>'.
+
+    The prefix defaults to the generator's creation time in milliseconds (base 36), so IDs do
+    not collide across restarts, and the sequence is a monotonic counter, so generating an ID
+    needs no clock call. itertools.count is atomic under the GIL, so the generator can be
+    shared between sending threads.
+    """
+    def __init__(self, prefix=None):
+        if prefix is None:
+            prefix = to_base36(time.time_ns() // 1000000)
+        self.prefix = f"{prefix}_"
+        self.sequence = itertools.count(1)
+
+    def next(self):
+        """
+        Returns:
+            str: A new ClOrdID.
+        """
+        return f"{self.prefix}{next(self.sequence)}"
+
+
+class MessageTemplates(threading.local):
+    """
+    Per-thread cache of pre-populated NewOrderSingle and OrderCancelRequest messages.
+
+    The static fields are set once per (symbol, side, ordType) or (symbol, side); sending only
+    patches ClOrdID, OrigClOrdID, OrderQty, Price and TransactTime through reused field holders.
+    QuickFIX serializes the message during sendToTarget, so a template can be reused as soon as
+    the call returns. Each thread gets its own templates, so no locking is needed.
+    """
+    def __init__(self):
+        self.new_orders = {} # (symbol, side, order_type) -> NewOrderSingle
+        self.cancels = {} # (symbol, side) -> OrderCancelRequest
+        self.cl_ord_id = fix.ClOrdID()
+        self.orig_cl_ord_id = fix.OrigClOrdID()
+        self.order_qty = fix.OrderQty()
+        self.price = fix.Price()
+
+    def new_order_single(self, cl_ord_id, symbol, side, order_type, quantity, price=None):
+        """
+        Return the NewOrderSingle template for the order, patched with its variable fields.
+
+        Args:
+            cl_ord_id (str): The client order ID.
+            symbol (str): The symbol to trade.
+            side (str): The side of the order (BUY, SELL, or SHORT).
+            order_type (str): The order type (MARKET or LIMIT).
+            quantity (int): The order quantity.
+            price (float): The limit price, only set for limit orders.
+
+        Returns:
+            Message: The message, valid until the next call from the same thread.
+        """
+        key = (symbol, side, order_type)
+        message = self.new_orders.get(key)
+        if message is None:
+            message = fix42.NewOrderSingle()
+            message.setField(fix.HandlInst(fix.HandlInst_MANUAL_ORDER_BEST_EXECUTION))
+            message.setField(fix.Symbol(symbol))
+            message.setField(fix.Side(side))
+            message.setField(fix.OrdType(order_type))
+            message.setField(fix.Text("New Order"))
+            self.new_orders[key] = message
+
+        self.cl_ord_id.setValue(cl_ord_id)
+        message.setField(self.cl_ord_id)
+        self.order_qty.setValue(quantity)
+        message.setField(self.order_qty)
+        message.setField(fix.TransactTime())
+        if price is not None:
+            self.price.setValue(price)
+            message.setField(self.price)
+        return message
+
+    def order_cancel_request(self, cl_ord_id, orig_cl_ord_id, symbol, side):
+        """
+        Return the OrderCancelRequest template for the order, patched with its variable fields.
+
+        Args:
+            cl_ord_id (str): The client order ID of the cancel request.
+            orig_cl_ord_id (str): The client order ID of the order to cancel.
+            symbol (str): The symbol of the order.
+            side (str): The side of the order.
+
+        Returns:
+            Message: The message, valid until the next call from the same thread.
+        """
+        key = (symbol, side)
+        message = self.cancels.get(key)
+        if message is None:
+            message = fix42.OrderCancelRequest()
+            message.setField(fix.Symbol(symbol))
+            message.setField(fix.Side(side))
+            message.setField(fix.Text("Order Cancel Request"))
+            self.cancels[key] = message
+
+        self.orig_cl_ord_id.setValue(orig_cl_ord_id)
+        message.setField(self.orig_cl_ord_id)
+        self.cl_ord_id.setValue(cl_ord_id)
+        message.setField(self.cl_ord_id)
+        message.setField(fix.TransactTime())
+        return message
@@ -0,0 +1,207 @@
+# in-process metrics with per-thread counters, exported in the Prometheus text format
+
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def _labels(names, values):
+    if not names:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for value in values)
+    return '{' + ','.join(f'{name}="{value}"' for name, value in zip(names, escaped)) + '}'
+
+
+class Counter:
+    """
+    Monotonic counter, optionally split by label values.
+
+    Each thread increments its own shard, so incrementing takes no lock; the shards are only
+    summed when the metrics are collected.
+    """
+    def __init__(self, name, help, label_names=()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(label_names)
+        self.shards = [] # one dict of label values -> count per incrementing thread
+        self.local = threading.local()
+        self.lock = threading.Lock()
+
+    def _shard(self):
+        cells = self.local.cells = {}
+        with self.lock:
+            self.shards = self.shards + [cells]
+        return cells
+
+    def inc(self, labels=(), amount=1):
+        """
+        Args:
+            labels (tuple): The label values, in the order of label_names.
+            amount (float): The increment.
+        """
+        try:
+            cells = self.local.cells
+        except AttributeError:
+            cells = self._shard()
+        cells[labels] = cells.get(labels, 0) + amount
+
+    def collect(self):
+        """
+        Returns:
+            dict: label values -> total over the threads.
+        """
+        totals = {}
+        for cells in self.shards:
+            for labels, value in dict(cells).items(): # the copy is atomic under the GIL
+                totals[labels] = totals.get(labels, 0) + value
+        return totals
+
+
+class Gauge:
+    """
+    Value read from a callback when the metrics are collected. The callback returns a number,
+    or a dict of label values -> number for a labelled gauge.
+    """
+    def __init__(self, name, help, function, label_names=()):
+        self.name = name
+        self.help = help
+        self.function = function
+        self.label_names = tuple(label_names)
+
+    def collect(self):
+        value = self.function()
+        if self.label_names:
+            return value
+        return {(): value}
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = []
+
+    def counter(self, name, help, label_names=()):
+        counter = Counter(name, help, label_names)
+        self.metrics.append(counter)
+        return counter
+
+    def gauge(self, name, help, function, label_names=()):
+        gauge = Gauge(name, help, function, label_names)
+        self.metrics.append(gauge)
+        return gauge
+
+    def render(self):
+        """
+        Returns:
+            str: The metrics in the Prometheus text exposition format.
+        """
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {'counter' if isinstance(metric, Counter) else 'gauge'}")
+            for labels, value in sorted(metric.collect().items()):
+                if value is not None:
+                    lines.append(f"{metric.name}{_labels(metric.label_names, labels)} {value}")
+        return '\n'.join(lines) + '\n'
+
+
+class MetricsServer:
+    """
+    Serve the metrics at http://host:port/metrics from a background thread.
+    """
+    def __init__(self, registry, host='127.0.0.1', port=8000):
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = registry.render().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass # scrapes are not worth a log line
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, name='MetricsServer', daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class MetricsFileWriter:
+    """
+    Write the metrics to a file every `interval` seconds, replacing it atomically, e.g. for
+    the node exporter's textfile collector.
+    """
+    def __init__(self, registry, path, interval=10.0):
+        self.registry = registry
+        self.path = path
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, name='MetricsFileWriter', daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+        self.write()
+
+    def write(self):
+        temporary = self.path + '.tmp'
+        with open(temporary, 'w') as file:
+            file.write(self.registry.render())
+        os.replace(temporary, self.path)
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            self.write()
+
+
+def instrument_client(registry, application):
+    """
+    Register the order event counters and the state gauges of a client.
+
+    The gauges are read when the metrics are collected; those reading positions and PnL take
+    the OrderManager's lock briefly, the others read sizes without locking. The QuickFIX
+    callback thread never waits for a collection.
+
+    Args:
+        registry (MetricsRegistry): The registry to add the metrics to.
+        application (Application): The client, with its OrderManager and in-flight window.
+    """
+    order_manager = application.order_manager
+    order_events = registry.counter('fix_order_events_total', "Order state changes applied: new (acks), fill, cancel, reject and cancel_reject", ('event',))
+    order_manager.add_listener(lambda event, order: order_events.inc((event,)))
+
+    def positions():
+        with order_manager.lock:
+            return {(symbol,): position['position'] for symbol, position in order_manager.positions.items()}
+
+    def pnl():
+        with order_manager.lock:
+            return {(symbol,): value for symbol, value in order_manager.stats.pnl.items()}
+
+    def volume():
+        with order_manager.lock:
+            return {(symbol,): value for symbol, value in order_manager.stats.total_volume().items()}
+
+    registry.gauge('fix_open_orders', "Acknowledged orders still open", lambda: len(order_manager.active_orders))
+    registry.gauge('fix_orders_in_flight', "Orders sent but not yet acknowledged", lambda: len(order_manager.pending_orders))
+    registry.gauge('fix_window_size', "Size of the in-flight window", lambda: application.window.capacity)
+    registry.gauge('fix_window_in_flight', "Orders and cancels in the in-flight window", lambda: application.window.in_flight)
+    registry.gauge('fix_event_queue_depth', "Execution events waiting for the OrderManager worker", lambda: len(order_manager.events))
+    registry.gauge('fix_position', "Position by symbol", positions, ('symbol',))
+    registry.gauge('fix_pnl', "PnL by symbol", pnl, ('symbol',))
+    registry.gauge('fix_volume', "Total volume by symbol, as calculated in statistics.py", volume, ('symbol',))
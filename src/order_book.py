@@ -0,0 +1,171 @@
+# compact book of the open orders, with O(1) add, fill, cancel and random sampling
+
+import random
+
+
+class Order:
+    """
+    An open order. Slotted to keep the per-order footprint small.
+    """
+    __slots__ = ('cl_ord_id', 'symbol', 'side', 'quantity', 'price', 'filled_quantity', 'ack_time', 'pending_cancel')
+
+    def __init__(self, cl_ord_id, symbol, side, quantity, price, ack_time=0.0):
+        self.cl_ord_id = cl_ord_id
+        self.symbol = symbol
+        self.side = side
+        self.quantity = quantity
+        self.price = price
+        self.filled_quantity = 0
+        self.ack_time = ack_time # time.monotonic() of the NEW acknowledgement
+        self.pending_cancel = None # ClOrdID of the cancel request in flight, if any
+
+    def __repr__(self):
+        return (f"Order({self.cl_ord_id}, {self.symbol}, side={self.side}, quantity={self.quantity}, "
+                f"price={self.price}, filled_quantity={self.filled_quantity})")
+
+
+class IndexedSet:
+    """
+    Set supporting O(1) insert, remove and uniform random sampling.
+
+    Items are kept in a list with a position index; removal swaps the last item into the
+    vacated slot.
+    """
+    __slots__ = ('items', 'positions')
+
+    def __init__(self):
+        self.items = []
+        self.positions = {}
+
+    def __len__(self):
+        return len(self.items)
+
+    def __contains__(self, item):
+        return item in self.positions
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def add(self, item):
+        if item not in self.positions:
+            self.positions[item] = len(self.items)
+            self.items.append(item)
+
+    def discard(self, item):
+        position = self.positions.pop(item, None)
+        if position is None:
+            return
+        last = self.items.pop()
+        if position < len(self.items):
+            self.items[position] = last
+            self.positions[last] = position
+
+    def sample(self, rng=random):
+        """
+        Returns:
+            A uniformly chosen item, or None if the set is empty.
+        """
+        if not self.items:
+            return None
+        return self.items[int(rng.random() * len(self.items))]
+
+
+class OrderBook:
+    """
+    Open orders keyed by ClOrdID, with secondary indexes by symbol and side.
+    """
+    def __init__(self):
+        self.orders = {} # cl_ord_id -> Order
+        self.ids = IndexedSet() # for O(1) random sampling
+        self.symbol_index = {} # symbol -> IndexedSet of cl_ord_id
+        self.side_index = {} # side -> IndexedSet of cl_ord_id
+
+    def __len__(self):
+        return len(self.orders)
+
+    def __contains__(self, cl_ord_id):
+        return cl_ord_id in self.orders
+
+    def __iter__(self):
+        return iter(self.orders)
+
+    def __repr__(self):
+        counts = ", ".join(f"{symbol}={len(ids)}" for symbol, ids in self.symbol_index.items() if ids)
+        return f"OrderBook(open={len(self.orders)}{', ' + counts if counts else ''})"
+
+    def get(self, cl_ord_id):
+        return self.orders.get(cl_ord_id)
+
+    def values(self):
+        return self.orders.values()
+
+    def add(self, order):
+        """
+        Add an order to the book.
+
+        Args:
+            order (Order): The order to add.
+        """
+        self.orders[order.cl_ord_id] = order
+        self.ids.add(order.cl_ord_id)
+        self.symbol_index.setdefault(order.symbol, IndexedSet()).add(order.cl_ord_id)
+        self.side_index.setdefault(order.side, IndexedSet()).add(order.cl_ord_id)
+
+    def remove(self, cl_ord_id):
+        """
+        Remove an order from the book.
+
+        Args:
+            cl_ord_id (str): The client order ID.
+
+        Returns:
+            Order: The removed order, or None if it was not in the book.
+        """
+        order = self.orders.pop(cl_ord_id, None)
+        if order is not None:
+            self.ids.discard(cl_ord_id)
+            self.symbol_index[order.symbol].discard(cl_ord_id)
+            self.side_index[order.side].discard(cl_ord_id)
+        return order
+
+    def fill(self, cl_ord_id, quantity):
+        """
+        Apply a fill to an order, removing it from the book once it is fully filled.
+
+        Args:
+            cl_ord_id (str): The client order ID.
+            quantity (int): The filled quantity.
+
+        Returns:
+            Order: The filled order, or None if it was not in the book.
+        """
+        order = self.orders.get(cl_ord_id)
+        if order is not None:
+            order.filled_quantity += quantity
+            if order.filled_quantity >= order.quantity:
+                self.remove(cl_ord_id)
+        return order
+
+    def sample(self, rng=random):
+        """
+        Pick a uniformly random open order.
+
+        Returns:
+            Order: The chosen order, or None if the book is empty.
+        """
+        cl_ord_id = self.ids.sample(rng)
+        return None if cl_ord_id is None else self.orders[cl_ord_id]
+
+    def by_symbol(self, symbol):
+        """
+        Returns:
+            IndexedSet: The ClOrdIDs of the open orders for the symbol.
+        """
+        return self.symbol_index.get(symbol, IndexedSet())
+
+    def by_side(self, side):
+        """
+        Returns:
+            IndexedSet: The ClOrdIDs of the open orders for the side.
+        """
+        return self.side_index.get(side, IndexedSet())
@@ -1,46 +1,463 @@
 # manage the state of the orders and handle order cancellations
 
+import logging
 import random
 import time
-from datetime import datetime, timedelta
-from threading import Thread
-from statistics import calculate_statistics
+from collections import namedtuple
+from threading import Thread, RLock, Condition
+from statistics import StatisticsAccumulator, print_total_volume, print_pnl
+from trade_store import TradeStore
+from order_book import Order, OrderBook
+from cancel_scheduler import CancelScheduler, RandomCancelPolicy
+from pacer import Pacer, sleep_until
+from event_queue import EventQueue
+from logger import EXEC_LOGGER
 import quickfix as fix
 import quickfix42 as fix42
 
+# execution events, passed as tuples (kind, cl_ord_id, orig_cl_ord_id, symbol, side, price, quantity)
+# where price and quantity are the order's for EVENT_NEW and the last fill's for EVENT_FILL, and
+# cl_ord_id is the cancel request's for EVENT_CANCEL and EVENT_CANCEL_REJECT
+ExecutionEvent = namedtuple('ExecutionEvent', ['kind', 'cl_ord_id', 'orig_cl_ord_id', 'symbol', 'side', 'price', 'quantity'])
+EVENT_NEW = 'new'
+EVENT_FILL = 'fill'
+EVENT_CANCEL = 'cancel'
+EVENT_REJECT = 'reject'
+EVENT_CANCEL_REJECT = 'cancel_reject'
+
+exec_log = logging.getLogger(EXEC_LOGGER)
+
 class OrderManager:
-    def __init__(self):
-        self.active_orders = {} # dictionary of dictionaries, key: cl_ord_id, value: order data, to keep track of orders unfilled to cancel
-        self.trade_data = [] # list of dictionaries, filled orders, to calculate stats for filled orders
+    def __init__(self, queue_capacity=65536):
+        self.active_orders = OrderBook() # open orders keyed by cl_ord_id, to keep track of orders unfilled to cancel
+        self.trade_data = TradeStore() # columnar store of fills, to calculate stats for filled orders
+        self.stats = StatisticsAccumulator() # running statistics, updated on every fill
         self.positions = {}  # dictionary to keep track of positions and average prices
+        self.pending_orders = set() # cl_ord_ids sent but not yet acknowledged
+        self.orders_submitted = 0
         self.orders_sent = 0
         self.orders_cancelled = 0
+        self.orders_rejected = 0
+        self.cancels_rejected = 0
+        self.lock = RLock()
+        self.state_changed = Condition(self.lock) # notified whenever the order state changes
+        self.last_change = time.monotonic()
+        self.listeners = [] # callables (event, order) invoked with the lock held on 'new', 'fill', 'cancel', 'reject' and 'cancel_reject'
+        self.events = EventQueue(queue_capacity) # execution events from the FIX thread, applied by the worker
+        self.worker = None
+        self.running = False
+        self.journal = None # StateJournal recording the applied events, see journal.py
+
+    def start(self):
+        """
+        Start the worker thread that owns the order state and applies the execution events.
+        Until it is started, events are applied synchronously by the caller.
+        """
+        self.running = True
+        self.worker = Thread(target=self._run, name='OrderManager', daemon=True)
+        self.worker.start()
+
+    def stop(self, timeout=None):
+        """
+        Apply the queued events and stop the worker thread.
+
+        Args:
+            timeout (float): Maximum time to wait for the worker in seconds, None to wait forever.
+        """
+        if self.worker is None:
+            return
+        self.running = False
+        self.events.wake()
+        self.worker.join(timeout)
+        self.worker = None
+
+    def _run(self):
+        events = self.events
+        while self.running:
+            self._apply_batch(events.drain())
+        self._apply_batch(events.drain(0))
+
+    def _apply_batch(self, batch):
+        if batch:
+            with self.lock:
+                for event in batch:
+                    try:
+                        self.apply_event(event)
+                    except Exception:
+                        # one bad event must not stop the worker, the later ones would pile up unapplied
+                        exec_log.exception("Failed to apply %s", event)
+
+    def on_execution(self, event):
+        """
+        Hand an execution event over from the FIX thread. Never blocks while the worker is running.
+
+        Args:
+            event (tuple): (kind, cl_ord_id, orig_cl_ord_id, symbol, side, price, quantity).
+        """
+        if self.worker is not None:
+            self.events.put(event)
+        else:
+            with self.lock:
+                self.apply_event(event)
+
+    def post_event(self, event):
+        """
+        Hand an event over from a thread other than the FIX thread, e.g. the rejection of a
+        request dropped from the in-flight window. Never blocks while the worker is running.
+
+        Args:
+            event (tuple): (kind, cl_ord_id, orig_cl_ord_id, symbol, side, price, quantity).
+        """
+        if self.worker is not None:
+            self.events.post(event)
+        else:
+            with self.lock:
+                self.apply_event(event)
+
+    def apply_event(self, event):
+        """
+        Apply an execution event to the order state. Called by the worker with the lock held.
+
+        Args:
+            event (tuple): (kind, cl_ord_id, orig_cl_ord_id, symbol, side, price, quantity).
+        """
+        kind, cl_ord_id, orig_cl_ord_id, symbol, side, price, quantity = event
+        if self.journal is not None and (kind != EVENT_REJECT or cl_ord_id in self.pending_orders):
+            self.journal.record(self, event) # rejects of orders no longer in flight change nothing
+        if kind == EVENT_FILL:
+            self.update_order(cl_ord_id, symbol, price, quantity, side)
+            self.update_position(symbol, price, quantity, side)
+        elif kind == EVENT_NEW:
+            # only add when executionreport NEW order response
+            self.add_order(cl_ord_id, symbol, side, quantity, price)
+            self.orders_sent += 1 # increment only upon confirmation (35=8)
+        elif kind == EVENT_CANCEL:
+            self.remove_order(cl_ord_id)
+            self.remove_order(orig_cl_ord_id)
+            self.orders_cancelled += 1 # increment only upon confirmation (35=8, 150=4)
+        elif kind == EVENT_REJECT:
+            self.reject_order(cl_ord_id)
+        elif kind == EVENT_CANCEL_REJECT:
+            self.reject_cancel(cl_ord_id, orig_cl_ord_id)
 
-    def add_order(self, cl_ord_id, order):
+    def export_state(self):
         """
-        Add a new order to the active orders list.
+        Export a copy of the order state for a journal snapshot. Must be called with the lock held.
+        The trade data is not included, the journal keeps it in its own append-only file.
+
+        Returns:
+            dict: The open orders, positions, statistics and counters.
+        """
+        stats = StatisticsAccumulator()
+        stats.merge(self.stats)
+        return {
+            'orders': [(order.cl_ord_id, order.symbol, order.side, order.quantity, order.price, order.filled_quantity,
+                        order.pending_cancel) for order in self.active_orders.values()],
+            'positions': {symbol: dict(position) for symbol, position in self.positions.items()},
+            'stats': stats,
+            'orders_submitted': self.orders_submitted,
+            'orders_sent': self.orders_sent,
+            'orders_cancelled': self.orders_cancelled,
+            'orders_rejected': self.orders_rejected,
+            'cancels_rejected': self.cancels_rejected,
+        }
+
+    def restore_state(self, state):
+        """
+        Restore the order state exported by export_state, with an empty trade store.
+
+        Args:
+            state (dict): The state from a journal snapshot.
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.active_orders = OrderBook()
+            for cl_ord_id, symbol, side, quantity, price, filled_quantity, pending_cancel in state['orders']:
+                order = Order(cl_ord_id, symbol, side, quantity, price, now)
+                order.filled_quantity = filled_quantity
+                order.pending_cancel = pending_cancel
+                self.active_orders.add(order)
+            self.positions = state['positions']
+            self.trade_data = TradeStore()
+            self.stats = state['stats']
+            self.orders_submitted = state['orders_submitted']
+            self.orders_sent = state['orders_sent']
+            self.orders_cancelled = state['orders_cancelled']
+            self.orders_rejected = state['orders_rejected']
+            self.cancels_rejected = state['cancels_rejected']
+
+    def snapshot(self):
+        """
+        Take a consistent copy of the statistics, counters and positions.
+
+        Returns:
+            dict: The statistics ('total_volume', 'pnl', 'vwap'), counters, open order count and positions.
+        """
+        with self.lock:
+            snapshot = self.stats.snapshot()
+            snapshot.update({
+                'orders_sent': self.orders_sent,
+                'orders_in_flight': len(self.pending_orders),
+                'orders_rejected': self.orders_rejected,
+                'orders_cancelled': self.orders_cancelled,
+                'cancels_rejected': self.cancels_rejected,
+                'active_orders': repr(self.active_orders),
+                'positions': {symbol: dict(position) for symbol, position in self.positions.items()}
+            })
+            return snapshot
+
+    def reconcile_statistics(self):
+        """
+        Recalculate the statistics from every fill in the trade store, with the vectorized
+        aggregations, and compare them with the running statistics. The store is copied under
+        the lock and aggregated outside of it.
+
+        Returns:
+            tuple: The recalculated statistics, and whether they match the running statistics.
+        """
+        with self.lock:
+            trade_data = self.trade_data.copy()
+            running = self.stats.snapshot()
+        recalculated = trade_data.statistics()
+        return recalculated, recalculated == running
+
+    def add_listener(self, listener):
+        """
+        Register a callable invoked as listener(event, order) on every order state change.
+
+        Args:
+            listener (callable): The callback, invoked with the lock held so it must not block.
+        """
+        with self.lock:
+            self.listeners = self.listeners + [listener]
+
+    def remove_listener(self, listener):
+        with self.lock:
+            self.listeners = [l for l in self.listeners if l != listener]
+
+    def _notify(self, event, order):
+        for listener in self.listeners:
+            try:
+                listener(event, order)
+            except Exception:
+                exec_log.exception("Listener %s failed on %s of %s", listener, event, order)
+        self.last_change = time.monotonic()
+        self.state_changed.notify_all()
+
+    def wait_for_acks(self, timeout=None):
+        """
+        Wait until every sent order has been acknowledged or rejected.
+
+        Args:
+            timeout (float): Maximum time to wait in seconds, None to wait forever.
+
+        Returns:
+            bool: True if no order is in flight, False if the timeout expired.
+        """
+        with self.state_changed:
+            return self.state_changed.wait_for(lambda: not self.pending_orders, timeout)
+
+    def wait_until_drained(self, timeout=None, idle=None):
+        """
+        Wait until every order is terminal, i.e. no order is in flight and none is active.
+
+        With `idle`, also return once every order is acknowledged and no execution report
+        has arrived for `idle` seconds, for orders that may never fill (e.g. limit orders).
+
+        Args:
+            timeout (float): Maximum time to wait in seconds, None to wait forever.
+            idle (float): Quiet period in seconds after which the session is considered settled.
+
+        Returns:
+            bool: True if the orders are drained or settled, False if the timeout expired.
+        """
+        end_time = None if timeout is None else time.monotonic() + timeout
+        with self.state_changed:
+            while True:
+                if not self.pending_orders and not self.active_orders:
+                    return True
+                now = time.monotonic()
+                wait = None if end_time is None else end_time - now
+                if not self.pending_orders and idle is not None:
+                    quiet_for = now - self.last_change
+                    if quiet_for >= idle:
+                        return True
+                    wait = idle - quiet_for if wait is None else min(wait, idle - quiet_for)
+                if wait is not None and wait <= 0:
+                    return False
+                self.state_changed.wait(wait)
+
+    @property
+    def orders_in_flight(self):
+        """
+        Returns:
+            int: The number of orders sent but not yet acknowledged or rejected.
+        """
+        return len(self.pending_orders)
+
+    def submit_order(self, cl_ord_id):
+        """
+        Track an order that is about to be sent, until it is acknowledged or rejected.
 
         Args:
             cl_ord_id (str): The client order ID.
-            order (dict): The order data containing details like symbol, side, quantity, and price.
         """
-        order['fills'] = []  # Initialize the fills list
-        order['filled_quantity'] = 0  # Initialize filled quantity
-        self.active_orders[cl_ord_id] = order
+        with self.lock:
+            self.pending_orders.add(cl_ord_id)
+            self.orders_submitted += 1
+
+    def reject_order(self, cl_ord_id):
+        """
+        Stop tracking an order that was rejected or could not be sent.
+
+        Args:
+            cl_ord_id (str): The client order ID.
+        """
+        with self.lock:
+            if cl_ord_id in self.pending_orders:
+                self.pending_orders.discard(cl_ord_id)
+                self.orders_rejected += 1
+                self._notify('reject', Order(cl_ord_id, None, None, 0, None)) # never reached the book
+
+    def add_order(self, cl_ord_id, symbol, side, quantity, price):
+        """
+        Add a new order to the active orders book.
+
+        Args:
+            cl_ord_id (str): The client order ID.
+            symbol (str): The symbol being traded.
+            side (int): The side of the order (BUY, SELL, or SHORT).
+            quantity (int): The order quantity.
+            price (float): The limit price of the order.
+        """
+        order = Order(cl_ord_id, symbol, side, quantity, price, time.monotonic())
+        with self.lock:
+            self.pending_orders.discard(cl_ord_id)
+            self.active_orders.add(order)
+            self._notify('new', order)
 
     def remove_order(self, cl_ord_id):
         """
-        Remove an order from the active orders list.
+        Remove an order from the active orders book.
 
         Args:
             cl_ord_id (str): The client order ID.
         """
-        if cl_ord_id in self.active_orders:
-            del self.active_orders[cl_ord_id]
+        with self.lock:
+            order = self.active_orders.remove(cl_ord_id)
+            if order is not None:
+                self._notify('cancel', order)
+
+    def cancel_order(self, fix_client, session_id, cl_ord_id, cancel_id=None, reserved=False):
+        """
+        Send an OrderCancelRequest for an open order, unless a cancel for it is already in flight.
+        The order is marked pending cancel until the cancel is confirmed or rejected.
+
+        Args:
+            fix_client (FixClient): The FIX client used to send the cancel request.
+            session_id (SessionID): The session ID for the FIX session.
+            cl_ord_id (str): The client order ID of the order to cancel.
+            cancel_id (str): ClOrdID of the cancel request, from fix_client.cl_ord_ids; a new one is generated if None.
+            reserved (bool): The caller already entered cancel_id in the in-flight window.
+
+        Returns:
+            str: The ClOrdID of the cancel request, or None if none was sent.
+        """
+        if cancel_id is None:
+            cancel_id = fix_client.cl_ord_ids.next()
+        with self.lock:
+            order = self.active_orders.get(cl_ord_id)
+            if order is None or order.pending_cancel is not None:
+                return None
+            order.pending_cancel = cancel_id
+            symbol, side = order.symbol, order.side
+        if fix_client.send_cancel_order(session_id, cl_ord_id, symbol, side, cl_ord_id=cancel_id, reserved=reserved) is None:
+            self.reject_cancel(cancel_id, cl_ord_id)
+            return None
+        return cancel_id
+
+    def reject_cancel(self, cancel_id, cl_ord_id):
+        """
+        Clear the pending cancel of an order whose cancel request was rejected or could not be sent.
+
+        Args:
+            cancel_id (str): The ClOrdID of the cancel request.
+            cl_ord_id (str): The client order ID of the order.
+        """
+        with self.lock:
+            self.cancels_rejected += 1
+            order = self.active_orders.get(cl_ord_id)
+            if order is not None and order.pending_cancel == cancel_id:
+                order.pending_cancel = None
+                self._notify('cancel_reject', order)
+
+    def mass_cancel(self, fix_client, session_id, symbol=None, side=None, min_age=None, timeout=None):
+        """
+        Cancel every open order matching the filters, sending the cancel requests back to back,
+        and wait until each targeted order is cancelled, filled, or its cancel is rejected.
+        Orders with a cancel already in flight are waited for but not cancelled again.
+
+        Args:
+            fix_client (FixClient): The FIX client used to send the cancel requests.
+            session_id (SessionID): The session ID for the FIX session.
+            symbol (str): Only cancel the orders for this symbol.
+            side (str): Only cancel the orders on this side.
+            min_age (float): Only cancel the orders acknowledged at least this many seconds ago.
+            timeout (float): Maximum time to wait for the outcomes in seconds, None to wait forever.
+
+        Returns:
+            dict: The number of orders 'targeted', cancel requests 'sent', orders 'cancelled' and 'filled',
+                cancels 'rejected', and orders still 'pending' at the timeout.
+        """
+        result = {'targeted': 0, 'sent': 0, 'cancelled': 0, 'filled': 0, 'rejected': 0, 'pending': 0}
+        remaining = set()
+
+        def on_event(event, order):
+            # called with the lock held
+            if order.cl_ord_id not in remaining:
+                return
+            if event == 'cancel':
+                result['cancelled'] += 1
+            elif event == 'fill' and order.filled_quantity >= order.quantity:
+                result['filled'] += 1
+            elif event == 'cancel_reject':
+                result['rejected'] += 1
+            else:
+                return
+            remaining.discard(order.cl_ord_id)
+
+        with self.lock:
+            book = self.active_orders
+            if symbol is not None:
+                candidates = book.by_symbol(symbol)
+            elif side is not None:
+                candidates = book.by_side(side)
+            else:
+                candidates = book.ids
+            now = time.monotonic()
+            for cl_ord_id in candidates:
+                order = book.get(cl_ord_id)
+                if (side is None or order.side == side) and (min_age is None or now - order.ack_time >= min_age):
+                    remaining.add(cl_ord_id)
+            targets = list(remaining)
+            result['targeted'] = len(targets)
+            self.add_listener(on_event)
+
+        try:
+            for cl_ord_id in targets:
+                if self.cancel_order(fix_client, session_id, cl_ord_id) is not None:
+                    result['sent'] += 1
+            with self.state_changed:
+                self.state_changed.wait_for(lambda: not remaining, timeout)
+                result['pending'] = len(remaining)
+        finally:
+            self.remove_listener(on_event)
+        return result
 
     def update_order(self, cl_ord_id, symbol, price, quantity, side):
         """
         Update an existing order during ExecType_FILL or ExecType_PARTIAL_FILL and add to trade data.
+        The order is removed from the book once it is fully filled.
 
         Args:
             cl_ord_id (str): The client order ID.
@@ -49,15 +466,12 @@ class OrderManager:
             quantity (int): The quantity of the trade.
             side (int): The side of the trade (BUY, SELL, or SHORT).
         """
-        if cl_ord_id in self.active_orders:
-            order = self.active_orders[cl_ord_id]
-            order['filled_quantity'] += quantity
-            order['fills'].append({'price': price, 'quantity': quantity})
-            self.trade_data.append({'symbol': symbol, 'price': price, 'quantity': quantity, 'side': side})
-
-            # Check if the order is fully filled
-            if order['filled_quantity'] >= order['quantity']:
-                del self.active_orders[cl_ord_id]
+        with self.lock:
+            order = self.active_orders.fill(cl_ord_id, quantity)
+            if order is not None:
+                self.trade_data.append(symbol, price, quantity, side)
+                self.stats.add_fill(symbol, price, quantity, side)
+                self._notify('fill', order)
 
     def update_position(self, symbol, price, quantity, side):
         """
@@ -96,52 +510,86 @@ class OrderManager:
             'avg_price': avg_price
         }
 
-    def generate_random_orders(self, fix_client, session_id, symbols, order_count, duration_minutes):
+    def generate_random_orders(self, fix_client, session_id, symbols, order_count, duration_minutes, pacer=None):
         """
         Generate random orders and send them to the FIX client.
 
+        Exactly `order_count` orders are sent (unless the duration runs out first), counting
+        sent orders rather than acknowledged ones so that slow acks do not cause overshoot.
+
         Args:
             fix_client (FixClient): The FIX client used to send orders.
             session_id (SessionID): The session ID for the FIX session.
             symbols (list): List of symbols to trade.
             order_count (int): The number of orders to send.
             duration_minutes (int): The duration in minutes over which to send the orders.
+            pacer (Pacer): Controls the sending rate, defaults to 10 orders per second.
         """
-        end_time = datetime.now() + timedelta(minutes=duration_minutes)
-        while self.orders_sent < order_count and datetime.now() < end_time:
+        if pacer is None:
+            pacer = Pacer(rate=10.0)
+        end_time = time.monotonic() + duration_minutes * 60
+        submitted = 0
+        while submitted < order_count and time.monotonic() < end_time:
             symbol = random.choice(symbols)
             side = random.choice([fix.Side_BUY, fix.Side_SELL, fix.Side_SELL_SHORT])
             order_type = random.choice([fix.OrdType_MARKET, fix.OrdType_LIMIT])
             quantity = random.randint(1, 100)
             price = round(random.uniform(100, 200), 2) if order_type == fix.OrdType_LIMIT else None  # Random price for limit orders
-            fix_client.send_order(session_id, symbol, side, order_type, quantity, price)
-            time.sleep(0.1)
-            # time.sleep(random.uniform(0.1, 1))  # Random delay between orders (for testing)
+            pacer.wait()
+            if fix_client.send_order(session_id, symbol, side, order_type, quantity, price) is not None:
+                submitted += 1
+
+    def replay_orders(self, fix_client, session_id, scenario, speed=1.0):
+        """
+        Send the orders of a Scenario at their scheduled times. The orders are converted to
+        Python values before the first send, so the send loop only does lookups.
+
+        Args:
+            fix_client (FixClient): The FIX client used to send orders.
+            session_id (SessionID): The session ID for the FIX session.
+            scenario (Scenario): The orders to send, from scenario.py.
+            speed (float): Time compression of the schedule, e.g. 2 to send twice as fast, None to send as fast as possible.
+
+        Returns:
+            int: The number of orders sent.
+        """
+        orders = scenario.to_list()
+        submitted = 0
+        start = time.perf_counter()
+        for symbol, side, order_type, quantity, price, offset in orders:
+            if speed is not None:
+                sleep_until(start + offset / speed) # absolute schedule, so send times do not drift
+            if fix_client.send_order(session_id, symbol, side, order_type, quantity, price) is not None:
+                submitted += 1
+        return submitted
 
-    def generate_random_cancellations(self, fix_client, session_id, duration_minutes):
+    def generate_random_cancellations(self, fix_client, session_id, duration_minutes, policy=None, until_empty=False):
         """
-        Generate random cancellations for active orders.
+        Generate cancellations for active orders. Blocks without polling while there is nothing to cancel.
 
         Args:
             fix_client (FixClient): The FIX client used to send cancel requests.
             session_id (SessionID): The session ID for the FIX session.
             duration_minutes (int): The duration in minutes over which to send the cancellations.
+            policy: The cancel policy from cancel_scheduler.py, defaults to a random order every 0.1s.
+            until_empty (bool): Stop as soon as there are no active orders left.
         """
-        end_time = datetime.now() + timedelta(minutes=duration_minutes)
-        while datetime.now() < end_time:
-            if self.active_orders:
-                cl_ord_id = random.choice(list(self.active_orders.keys()))
-                order = self.active_orders[cl_ord_id]
-                fix_client.send_cancel_order(session_id, cl_ord_id, order['symbol'], order['side'])
-                time.sleep(0.1)
-            # time.sleep(random.uniform(0.1, 1))  # Random delay between cancellations
+        if policy is None:
+            policy = RandomCancelPolicy(interval=0.1)
+        scheduler = CancelScheduler(self, fix_client, session_id, policy)
+        scheduler.run(duration=duration_minutes * 60, until_empty=until_empty)
 
     def print_statistics(self):
-        stats = calculate_statistics(self.trade_data)
+        stats = self.snapshot()
+        print_total_volume(stats['total_volume'])
+        print_pnl(stats['pnl'])
         print("Total Volume: ", stats['total_volume'])
         print("PNL: ", stats['pnl'])
         print("VWAP: ", stats['vwap'])
-        print("Orders sent: ", self.orders_sent)
-        print("Orders cancelled: ", self.orders_cancelled)
-        print("Active Orders: ", self.active_orders)
-        print("Positions: ", self.positions)
\ No newline at end of file
+        print("Orders sent: ", stats['orders_sent'])
+        print("Orders in flight: ", stats['orders_in_flight'])
+        print("Orders rejected: ", stats['orders_rejected'])
+        print("Orders cancelled: ", stats['orders_cancelled'])
+        print("Cancels rejected: ", stats['cancels_rejected'])
+        print("Active Orders: ", stats['active_orders'])
+        print("Positions: ", stats['positions'])
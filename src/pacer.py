@@ -0,0 +1,77 @@
+# pace outgoing orders at a target rate, in bursts, or with Poisson arrivals
+
+import random
+import time
+
+# below this margin, spin instead of sleeping, since time.sleep may overshoot by a scheduler tick
+SPIN_THRESHOLD = 0.0005
+
+
+def sleep_until(deadline):
+    """
+    Sleep until the time.perf_counter() deadline, spinning for the last fraction of a millisecond.
+
+    Args:
+        deadline (float): The perf_counter() value to wait for.
+    """
+    while True:
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            return
+        if remaining > SPIN_THRESHOLD:
+            time.sleep(remaining - SPIN_THRESHOLD)
+
+
+class Pacer:
+    """
+    Release orders at a controlled rate.
+
+    Modes:
+        'rate': token bucket refilled at `rate` per second, holding at most `burst` tokens.
+            Departure times are computed from the bucket state rather than by sleeping a fixed
+            interval after each send, so time spent sending does not accumulate as drift.
+        'burst': no pacing, orders are sent as fast as the caller can.
+        'poisson': exponentially distributed inter-arrival times with mean 1 / `rate`, scheduled
+            on an absolute timeline so the long run average rate is exact.
+    """
+    MODES = ('rate', 'burst', 'poisson')
+
+    def __init__(self, rate=10.0, mode='rate', burst=1, rng=None):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown pacing mode {mode}, expected one of {self.MODES}")
+        if mode != 'burst' and rate <= 0:
+            raise ValueError("Rate must be positive")
+        self.rate = rate
+        self.mode = mode
+        self.burst = max(1, burst)
+        self.rng = rng or random.Random()
+        self.tokens = 1.0
+        self.last = None
+        self.next_time = None
+
+    def wait(self):
+        """
+        Block until the next order may be sent.
+        """
+        if self.mode == 'burst':
+            return
+        now = time.perf_counter()
+        if self.mode == 'poisson':
+            if self.next_time is None:
+                self.next_time = now
+            else:
+                self.next_time += self.rng.expovariate(self.rate)
+            sleep_until(self.next_time)
+            return
+
+        # token bucket
+        if self.last is None:
+            self.last = now
+        self.tokens = min(self.burst, self.tokens + (now - self.last) * self.rate)
+        self.last = now
+        if self.tokens < 1.0:
+            deadline = now + (1.0 - self.tokens) / self.rate
+            sleep_until(deadline)
+            self.tokens = 1.0
+            self.last = deadline
+        self.tokens -= 1.0
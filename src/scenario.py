@@ -0,0 +1,128 @@
+# seeded order scenarios, generated up front with NumPy and replayed by the send loop
+
+import argparse
+import numpy as np
+import quickfix as fix
+
+SIDES = (fix.Side_BUY, fix.Side_SELL, fix.Side_SELL_SHORT)
+ORDER_TYPES = (fix.OrdType_MARKET, fix.OrdType_LIMIT)
+ARRIVALS = ('poisson', 'uniform')
+
+# one record per order, 24 bytes; price is NaN for market orders and offset is the send time
+# in seconds from the start of the scenario
+ORDER_DTYPE = np.dtype([('symbol', '<u2'), ('side', 'u1'), ('order_type', 'u1'), ('quantity', '<u4'),
+                        ('price', '<f8'), ('offset', '<f8')])
+
+
+class Scenario:
+    """
+    A reproducible stream of orders: symbol, side, order type, quantity, price and send time.
+    """
+    def __init__(self, symbols, orders, seed=None):
+        """
+        Args:
+            symbols (list): The symbols, indexed by the orders' symbol codes.
+            orders (ndarray): The orders, of dtype ORDER_DTYPE.
+            seed (int): The seed the scenario was generated from, if any.
+        """
+        self.symbols = list(symbols)
+        self.orders = orders
+        self.seed = seed
+
+    def __len__(self):
+        return len(self.orders)
+
+    @classmethod
+    def generate(cls, symbols, order_count, rate=10.0, arrivals='poisson', seed=None,
+                 quantity_range=(1, 100), price_range=(100.0, 200.0)):
+        """
+        Generate a scenario with the distributions of OrderManager.generate_random_orders:
+        uniform symbols, sides, order types, quantities and limit prices (rounded to cents).
+
+        Args:
+            symbols (list): List of symbols to trade.
+            order_count (int): The number of orders.
+            rate (float): The average number of orders per second.
+            arrivals (str): 'poisson' for exponential inter-arrival times, 'uniform' for a fixed interval.
+            seed (int): Seed of the random generator, None for a random scenario.
+            quantity_range (tuple): Smallest and largest quantity, inclusive.
+            price_range (tuple): Range of the limit prices.
+
+        Returns:
+            Scenario: The generated scenario.
+        """
+        if arrivals not in ARRIVALS:
+            raise ValueError(f"Unknown arrivals {arrivals}, expected one of {ARRIVALS}")
+        rng = np.random.default_rng(seed)
+        orders = np.empty(order_count, dtype=ORDER_DTYPE)
+        orders['symbol'] = rng.integers(0, len(symbols), order_count)
+        orders['side'] = rng.integers(0, len(SIDES), order_count)
+        orders['order_type'] = rng.integers(0, len(ORDER_TYPES), order_count)
+        orders['quantity'] = rng.integers(quantity_range[0], quantity_range[1] + 1, order_count)
+        prices = np.round(rng.uniform(price_range[0], price_range[1], order_count), 2)
+        is_limit = orders['order_type'] == ORDER_TYPES.index(fix.OrdType_LIMIT)
+        orders['price'] = np.where(is_limit, prices, np.nan)
+        if arrivals == 'poisson':
+            gaps = rng.exponential(1.0 / rate, order_count)
+        else:
+            gaps = np.full(order_count, 1.0 / rate)
+        orders['offset'] = np.cumsum(gaps) - gaps # the first order is sent at once
+        return cls(symbols, orders, seed)
+
+    def save(self, path):
+        """
+        Save the scenario to a .npz file holding the order records and the symbols. As with
+        np.savez, the .npz extension is added to the path if it has another one.
+
+        Returns:
+            str: The path of the file written.
+        """
+        if not path.endswith('.npz'):
+            path += '.npz'
+        np.savez(path, orders=self.orders, symbols=np.array(self.symbols),
+                 seed=np.array(-1 if self.seed is None else self.seed))
+        return path
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load a scenario saved by save(), given the same path.
+        """
+        if not path.endswith('.npz'):
+            path += '.npz'
+        with np.load(path, allow_pickle=False) as data:
+            seed = int(data['seed'])
+            return cls([str(symbol) for symbol in data['symbols']], data['orders'].astype(ORDER_DTYPE),
+                       None if seed < 0 else seed)
+
+    def to_list(self):
+        """
+        Convert the orders to Python values, so replaying them is nothing but lookups.
+
+        Returns:
+            list: (symbol, side, order_type, quantity, price or None, offset) tuples.
+        """
+        symbols, orders = self.symbols, self.orders
+        return [(symbols[symbol], SIDES[side], ORDER_TYPES[order_type], quantity, None if price != price else price, offset)
+                for symbol, side, order_type, quantity, price, offset in zip(
+                    orders['symbol'].tolist(), orders['side'].tolist(), orders['order_type'].tolist(),
+                    orders['quantity'].tolist(), orders['price'].tolist(), orders['offset'].tolist())]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a seeded order scenario")
+    parser.add_argument('path', help="output .npz file")
+    parser.add_argument('--symbols', nargs='+', default=["MSFT", "AAPL", "BAC"])
+    parser.add_argument('--orders', type=int, default=1000)
+    parser.add_argument('--rate', type=float, default=10.0, help="average orders per second")
+    parser.add_argument('--arrivals', choices=ARRIVALS, default='poisson')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    scenario = Scenario.generate(args.symbols, args.orders, args.rate, args.arrivals, args.seed)
+    path = scenario.save(args.path)
+    duration = scenario.orders['offset'][-1] if len(scenario) else 0.0
+    print(f"Wrote {len(scenario)} orders over {duration:.1f} seconds to {path}")
+
+
+if __name__ == "__main__":
+    main()
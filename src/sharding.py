@@ -0,0 +1,170 @@
+# run the order flow sharded by symbol over several sessions and worker processes
+
+import argparse
+import logging
+import multiprocessing
+import quickfix as fix
+from logger import configure_logging
+from main import run_session
+from dictionary_builder import ensure_dictionary
+from statistics import StatisticsAccumulator, print_total_volume, print_pnl
+
+
+def partition_symbols(symbols, shards):
+    """
+    Assign the symbols round-robin to the shards, so each symbol is owned by exactly one shard.
+
+    Args:
+        symbols (list): List of symbols to trade.
+        shards (int): The number of shards.
+
+    Returns:
+        list: The list of symbols of each shard.
+    """
+    return [symbols[index::shards] for index in range(shards)]
+
+
+def session_count(config_file):
+    """
+    Returns:
+        int: The number of sessions defined in the configuration file, i.e. the most shards it can run.
+    """
+    return len(fix.SessionSettings(config_file).getSessions())
+
+
+def shard_settings(config_file, index):
+    """
+    Build session settings holding only the index-th session of the configuration file.
+
+    Args:
+        config_file (str): Path to the FIX configuration, with at least one session per shard.
+        index (int): The shard index.
+
+    Returns:
+        SessionSettings: The settings of the shard's session.
+    """
+    settings = fix.SessionSettings(config_file)
+    sessions = sorted(settings.getSessions(), key=str)
+    if index >= len(sessions):
+        raise ValueError(f"{config_file} defines {len(sessions)} sessions, a session is needed for every shard")
+    session = sessions[index]
+    single = fix.SessionSettings()
+    single.set(settings.get())
+    single.set(session, settings.get(session))
+    return single
+
+
+def run_shard(index, config_file, symbols, order_count, duration_minutes):
+    """
+    Worker process: run one session trading the shard's symbols.
+
+    Returns:
+        dict: The shard's statistics accumulator, positions and order counters.
+    """
+    log_listener = configure_logging(logging.WARNING)
+    try:
+        result = run_session(shard_settings(config_file, index), symbols, order_count, duration_minutes)
+    finally:
+        log_listener.stop()
+    if result is None:
+        return None
+    order_manager, _ = result
+    snapshot = order_manager.snapshot()
+    return {
+        'shard': index,
+        'symbols': symbols,
+        'stats': order_manager.stats,
+        'positions': snapshot['positions'],
+        'orders_sent': snapshot['orders_sent'],
+        'orders_cancelled': snapshot['orders_cancelled'],
+        'orders_rejected': snapshot['orders_rejected'],
+    }
+
+
+def merge_positions(shard_positions):
+    """
+    Merge per-shard positions, recomputing the average prices.
+
+    Args:
+        shard_positions (list): The positions dictionary of each shard.
+
+    Returns:
+        dict: The merged positions and average prices per symbol.
+    """
+    merged = {}
+    for positions in shard_positions:
+        for symbol, position in positions.items():
+            total = merged.setdefault(symbol, {'position': 0, 'total_cost': 0, 'avg_price': None})
+            total['position'] += position['position']
+            total['total_cost'] += position['total_cost']
+    for total in merged.values():
+        total['avg_price'] = abs(total['total_cost'] / total['position']) if total['position'] != 0 else None
+    return merged
+
+
+def run_sharded(config_file, symbols, shards, order_count, duration_minutes):
+    """
+    Coordinator: start one worker process per shard and merge their results.
+
+    Args:
+        config_file (str): Path to the FIX configuration, with at least one session per shard.
+        symbols (list): List of symbols to trade.
+        shards (int): The number of worker processes.
+        order_count (int): The total number of orders, split evenly between the shards.
+        duration_minutes (int): The duration in minutes of each phase.
+
+    Returns:
+        dict: The merged statistics, positions and order counters.
+    """
+    shards = min(shards, len(symbols))
+    sessions = session_count(config_file)
+    if shards > sessions: # checked up front, the pool only returns once every shard has run
+        raise ValueError(f"{config_file} defines {sessions} sessions, a session is needed for every one of the {shards} shards")
+    partitions = partition_symbols(symbols, shards)
+    counts = [order_count // shards + (1 if index < order_count % shards else 0) for index in range(shards)]
+    ensure_dictionary() # once here, rather than racing in the workers
+    context = multiprocessing.get_context('spawn')
+    with context.Pool(shards) as pool:
+        results = pool.starmap(run_shard, [(index, config_file, partitions[index], counts[index], duration_minutes)
+                                           for index in range(shards)])
+
+    stats = StatisticsAccumulator()
+    merged = {'orders_sent': 0, 'orders_cancelled': 0, 'orders_rejected': 0, 'failed_shards': []}
+    for index, result in enumerate(results):
+        if result is None:
+            merged['failed_shards'].append(index)
+            continue
+        stats.merge(result['stats'])
+        for counter in ('orders_sent', 'orders_cancelled', 'orders_rejected'):
+            merged[counter] += result[counter]
+    merged.update(stats.snapshot())
+    merged['positions'] = merge_positions([result['positions'] for result in results if result is not None])
+    return merged
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the order flow sharded by symbol over several FIX sessions")
+    parser.add_argument('--config', default="../config/fix.cfg", help="FIX configuration with one session per shard")
+    parser.add_argument('--shards', type=int, default=None, help="number of worker processes, by default one per session of the configuration")
+    parser.add_argument('--symbols', nargs='+', default=["MSFT", "AAPL", "BAC"])
+    parser.add_argument('--order-count', type=int, default=1000)
+    parser.add_argument('--duration-minutes', type=float, default=5)
+    args = parser.parse_args()
+    shards = args.shards if args.shards is not None else session_count(args.config)
+
+    merged = run_sharded(args.config, args.symbols, shards, args.order_count, args.duration_minutes)
+    print_total_volume(merged['total_volume'])
+    print_pnl(merged['pnl'])
+    print("Total Volume: ", merged['total_volume'])
+    print("PNL: ", merged['pnl'])
+    print("VWAP: ", merged['vwap'])
+    print("Orders sent: ", merged['orders_sent'])
+    print("Orders rejected: ", merged['orders_rejected'])
+    print("Orders cancelled: ", merged['orders_cancelled'])
+    print("Positions: ", merged['positions'])
+    if merged['failed_shards']:
+        print("Shards that did not logon: ", merged['failed_shards'])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+# local FIX 4.2 acceptor with a simple matching engine, to exercise the client offline
+
+import argparse
+import heapq
+import itertools
+import logging
+import random
+import threading
+import time
+import quickfix as fix
+import quickfix42 as fix42
+
+
+class DelayedDispatcher:
+    """
+    Run callbacks after a delay on a single background thread, in due-time order.
+    """
+    def __init__(self):
+        self.queue = [] # heap of (due time, sequence, callback)
+        self.sequence = itertools.count()
+        self.condition = threading.Condition()
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name='DelayedDispatcher', daemon=True)
+        self.thread.start()
+
+    def schedule(self, delay, callback):
+        with self.condition:
+            heapq.heappush(self.queue, (time.monotonic() + delay, next(self.sequence), callback))
+            self.condition.notify()
+
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        self.thread.join()
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while self.running:
+                    now = time.monotonic()
+                    if self.queue and self.queue[0][0] <= now:
+                        break
+                    self.condition.wait(self.queue[0][0] - now if self.queue else None)
+                if not self.running:
+                    return
+                _, _, callback = heapq.heappop(self.queue)
+            try:
+                callback()
+            except Exception:
+                logging.exception("Delayed callback failed")
+
+
+class SimulatedOrder:
+    __slots__ = ('order_id', 'cl_ord_id', 'symbol', 'side', 'order_type', 'quantity', 'price', 'cum_qty', 'avg_px', 'open')
+
+    def __init__(self, order_id, cl_ord_id, symbol, side, order_type, quantity, price):
+        self.order_id = order_id
+        self.cl_ord_id = cl_ord_id
+        self.symbol = symbol
+        self.side = side
+        self.order_type = order_type
+        self.quantity = quantity
+        self.price = price
+        self.cum_qty = 0.0
+        self.avg_px = 0.0
+        self.open = True
+
+
+class SimulatorApplication(fix.Application):
+    """
+    Acceptor side of a simulated counterparty.
+
+    Every NewOrderSingle is acknowledged with ExecType NEW after `ack_delay` seconds. A
+    `fill_ratio` fraction of the orders is then executed in `partial_fills` PARTIAL_FILL
+    reports followed by a FILL, `fill_delay` seconds apart; the other orders rest until they
+    are cancelled. Limit orders fill at their price, market orders at a random price in
+    [price_low, price_high]. Cancel requests for open orders are answered with CANCELLED,
+    otherwise with an OrderCancelReject.
+    """
+    def __init__(self, fill_ratio=0.7, partial_fills=1, ack_delay=0.0, fill_delay=0.001,
+                 price_low=100.0, price_high=200.0, seed=None):
+        super().__init__()
+        self.fill_ratio = fill_ratio
+        self.partial_fills = partial_fills
+        self.ack_delay = ack_delay
+        self.fill_delay = fill_delay
+        self.price_low = price_low
+        self.price_high = price_high
+        self.rng = random.Random(seed)
+        self.orders = {} # cl_ord_id -> SimulatedOrder
+        self.lock = threading.Lock()
+        self.order_ids = itertools.count(1)
+        self.exec_ids = itertools.count(1)
+        self.dispatcher = DelayedDispatcher()
+
+    def onCreate(self, sessionID):
+        logging.info(f"Simulator session created: {sessionID}")
+
+    def onLogon(self, sessionID):
+        logging.info(f"Simulator logon: {sessionID}")
+
+    def onLogout(self, sessionID):
+        logging.info(f"Simulator logout: {sessionID}")
+
+    def toAdmin(self, message, sessionID):
+        pass
+
+    def fromAdmin(self, message, sessionID):
+        pass
+
+    def toApp(self, message, sessionID):
+        pass
+
+    def fromApp(self, message, sessionID):
+        msgType = fix.MsgType()
+        message.getHeader().getField(msgType)
+        if msgType.getValue() == fix.MsgType_NewOrderSingle:
+            self.onNewOrderSingle(message, sessionID)
+        elif msgType.getValue() == fix.MsgType_OrderCancelRequest:
+            self.onOrderCancelRequest(message, sessionID)
+        else:
+            raise fix.UnsupportedMessageType()
+
+    def stop(self):
+        self.dispatcher.stop()
+
+    def _later(self, delay, callback):
+        if delay > 0:
+            self.dispatcher.schedule(delay, callback)
+        else:
+            callback()
+
+    def onNewOrderSingle(self, message, sessionID):
+        cl_ord_id = message.getField(fix.ClOrdID().getTag())
+        symbol = message.getField(fix.Symbol().getTag())
+        side = message.getField(fix.Side().getTag())
+        order_type = message.getField(fix.OrdType().getTag())
+        quantity = float(message.getField(fix.OrderQty().getTag()))
+        price = float(message.getField(fix.Price().getTag())) if message.isSetField(fix.Price().getTag()) else None
+
+        order = SimulatedOrder(str(next(self.order_ids)), cl_ord_id, symbol, side, order_type, quantity, price)
+        with self.lock:
+            self.orders[cl_ord_id] = order
+
+        def acknowledge():
+            self.send_report(order, sessionID, fix.ExecType_NEW, fix.OrdStatus_NEW)
+            if self.rng.random() < self.fill_ratio:
+                self._later(self.fill_delay, lambda: self.fill(order, sessionID, self.partial_fills))
+        self._later(self.ack_delay, acknowledge)
+
+    def fill(self, order, sessionID, partials_left):
+        with self.lock:
+            if not order.open:
+                return
+            leaves = order.quantity - order.cum_qty
+            last_qty = max(1.0, float(int(leaves / (partials_left + 1)))) if partials_left else leaves
+            last_qty = min(last_qty, leaves)
+            last_px = order.price if order.price is not None else round(self.rng.uniform(self.price_low, self.price_high), 2)
+            order.avg_px = (order.avg_px * order.cum_qty + last_px * last_qty) / (order.cum_qty + last_qty)
+            order.cum_qty += last_qty
+            final = order.cum_qty >= order.quantity
+            if final:
+                order.open = False
+                del self.orders[order.cl_ord_id]
+        if final:
+            self.send_report(order, sessionID, fix.ExecType_FILL, fix.OrdStatus_FILLED, last_px, last_qty)
+        else:
+            self.send_report(order, sessionID, fix.ExecType_PARTIAL_FILL, fix.OrdStatus_PARTIALLY_FILLED, last_px, last_qty)
+            self._later(self.fill_delay, lambda: self.fill(order, sessionID, partials_left - 1))
+
+    def onOrderCancelRequest(self, message, sessionID):
+        cl_ord_id = message.getField(fix.ClOrdID().getTag())
+        orig_cl_ord_id = message.getField(fix.OrigClOrdID().getTag())
+        with self.lock:
+            order = self.orders.pop(orig_cl_ord_id, None)
+            if order is not None:
+                order.open = False
+        if order is None:
+            reject = fix42.OrderCancelReject()
+            reject.setField(fix.OrderID('NONE'))
+            reject.setField(fix.ClOrdID(cl_ord_id))
+            reject.setField(fix.OrigClOrdID(orig_cl_ord_id))
+            reject.setField(fix.OrdStatus(fix.OrdStatus_REJECTED))
+            reject.setField(fix.CxlRejResponseTo(fix.CxlRejResponseTo_ORDER_CANCEL_REQUEST))
+            reject.setField(fix.CxlRejReason(fix.CxlRejReason_UNKNOWN_ORDER))
+            fix.Session.sendToTarget(reject, sessionID)
+            return
+        self._later(self.ack_delay, lambda: self.send_report(order, sessionID, fix.ExecType_CANCELLED, fix.OrdStatus_CANCELED,
+                                                             cl_ord_id=cl_ord_id, orig_cl_ord_id=orig_cl_ord_id))
+
+    def send_report(self, order, sessionID, exec_type, ord_status, last_px=0.0, last_qty=0.0, cl_ord_id=None, orig_cl_ord_id=None):
+        report = fix42.ExecutionReport()
+        report.setField(fix.OrderID(order.order_id))
+        report.setField(fix.ExecID(str(next(self.exec_ids))))
+        report.setField(fix.ExecTransType(fix.ExecTransType_NEW))
+        report.setField(fix.ExecType(exec_type))
+        report.setField(fix.OrdStatus(ord_status))
+        report.setField(fix.ClOrdID(cl_ord_id or order.cl_ord_id))
+        if orig_cl_ord_id is not None:
+            report.setField(fix.OrigClOrdID(orig_cl_ord_id))
+        report.setField(fix.Symbol(order.symbol))
+        report.setField(fix.Side(order.side))
+        report.setField(fix.OrdType(order.order_type))
+        report.setField(fix.OrderQty(order.quantity))
+        if order.price is not None:
+            report.setField(fix.Price(order.price))
+        report.setField(fix.LastPx(last_px))
+        report.setField(fix.LastQty(last_qty))
+        leaves = 0.0 if exec_type == fix.ExecType_CANCELLED else order.quantity - order.cum_qty
+        report.setField(fix.LeavesQty(leaves))
+        report.setField(fix.CumQty(order.cum_qty))
+        report.setField(fix.AvgPx(order.avg_px))
+        fix.Session.sendToTarget(report, sessionID)
+
+
+def run_simulator(config_file, stop_event, **options):
+    """
+    Run the simulated acceptor until stop_event is set.
+
+    Args:
+        config_file (str): Acceptor session settings, e.g. ../config/simulator.cfg.
+        stop_event (Event): threading or multiprocessing Event stopping the simulator.
+        **options: Passed to SimulatorApplication (fill_ratio, partial_fills, ack_delay, fill_delay, seed).
+    """
+    application = SimulatorApplication(**options)
+    settings = fix.SessionSettings(config_file)
+    acceptor = fix.SocketAcceptor(application, fix.MemoryStoreFactory(), settings, fix.FileLogFactory(settings))
+    acceptor.start()
+    try:
+        stop_event.wait()
+    finally:
+        acceptor.stop()
+        application.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local simulated FIX 4.2 acceptor")
+    parser.add_argument('--config', default="../config/simulator.cfg")
+    parser.add_argument('--fill-ratio', type=float, default=0.7, help="fraction of the orders that get filled")
+    parser.add_argument('--partial-fills', type=int, default=1, help="partial fills before the final fill")
+    parser.add_argument('--ack-delay', type=float, default=0.0, help="seconds before acknowledging an order or cancel")
+    parser.add_argument('--fill-delay', type=float, default=0.001, help="seconds between the ack and each fill")
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    stop_event = threading.Event()
+    try:
+        run_simulator(args.config, stop_event, fill_ratio=args.fill_ratio, partial_fills=args.partial_fills,
+                      ack_delay=args.ack_delay, fill_delay=args.fill_delay, seed=args.seed)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -105,3 +105,89 @@ def calculate_statistics(trade_data):
         'pnl': pnl,
         'vwap': vwap
     }
+
+
+class StatisticsAccumulator:
+    """
+    Incrementally maintain the trading statistics as fills arrive.
+
+    Each fill updates the running per-symbol notional, signed PnL and quantity in O(1),
+    so a snapshot costs O(symbols) regardless of the number of fills. The results are
+    identical to the batch functions above since the same sums are accumulated in the
+    same order.
+    """
+    def __init__(self):
+        self.notional = {} # symbol -> sum of price * quantity
+        self.pnl = {} # symbol -> signed sum of price * quantity
+        self.quantity = {} # symbol -> sum of quantity
+        self.fill_count = 0
+
+    def add_fill(self, symbol, price, quantity, side):
+        """
+        Account for a single fill.
+
+        Args:
+            symbol (str): The symbol being traded.
+            price (float): The price of the trade.
+            quantity (int): The quantity of the trade.
+            side (int): The side of the trade (BUY, SELL, or SHORT).
+        """
+        side = int(side) # quickfix returns the side as a FIX char, e.g. '1'
+        value = price * quantity
+        if symbol in self.notional:
+            self.notional[symbol] += value
+            self.quantity[symbol] += quantity
+        else:
+            self.notional[symbol] = value
+            self.quantity[symbol] = quantity
+            self.pnl[symbol] = 0
+        if side == 1:  # BUY
+            self.pnl[symbol] -= value
+        elif side == 2 or side == 5:  # SELL or SHORT
+            self.pnl[symbol] += value
+        self.fill_count += 1
+
+    def total_volume(self):
+        """
+        Returns:
+            dict: Dictionary containing total volume for each symbol, rounded to 2 decimal places.
+        """
+        return {k: round(v, 2) for k, v in self.notional.items()}
+
+    def vwap(self):
+        """
+        Returns:
+            dict: Dictionary containing VWAP for each symbol, rounded to 2 decimal places.
+        """
+        return {k: round(v / self.quantity[k], 2) for k, v in self.notional.items()}
+
+    def snapshot(self):
+        """
+        Return the statistics in the same format as calculate_statistics, without printing.
+
+        Returns:
+            dict: Dictionary with 'total_volume', 'pnl' and 'vwap' per symbol.
+        """
+        return {
+            'total_volume': self.total_volume(),
+            'pnl': dict(self.pnl),
+            'vwap': self.vwap()
+        }
+
+    def merge(self, other):
+        """
+        Add the fills accounted by another accumulator, e.g. from another shard.
+
+        Args:
+            other (StatisticsAccumulator): The accumulator to merge into this one.
+        """
+        for symbol, value in other.notional.items():
+            if symbol in self.notional:
+                self.notional[symbol] += value
+                self.quantity[symbol] += other.quantity[symbol]
+                self.pnl[symbol] += other.pnl[symbol]
+            else:
+                self.notional[symbol] = value
+                self.quantity[symbol] = other.quantity[symbol]
+                self.pnl[symbol] = other.pnl[symbol]
+        self.fill_count += other.fill_count
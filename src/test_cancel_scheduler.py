@@ -0,0 +1,73 @@
+# check that the cancel scheduler skips orders already pending cancel
+
+import threading
+import time
+import unittest
+from cancel_scheduler import CancelScheduler, RandomCancelPolicy
+from order_book import Order, OrderBook
+
+
+class FakeOrderManager:
+    """
+    The part of the OrderManager used by the scheduler; cancels are only recorded.
+    """
+    def __init__(self):
+        self.active_orders = OrderBook()
+        self.state_changed = threading.Condition(threading.RLock())
+        self.listeners = []
+        self.cancelled = []
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    def remove_listener(self, listener):
+        self.listeners.remove(listener)
+
+    def cancel_order(self, fix_client, session_id, cl_ord_id):
+        with self.state_changed:
+            self.active_orders.get(cl_ord_id).pending_cancel = f"cancel-{cl_ord_id}"
+            self.cancelled.append(cl_ord_id)
+        return f"cancel-{cl_ord_id}"
+
+
+class CancelSchedulerTest(unittest.TestCase):
+    def test_random_policy_skips_pending_cancels(self):
+        book = OrderBook()
+        for index in range(4):
+            book.add(Order(f"order-{index}", "MSFT", '1', 10, 100.0))
+        for index in range(3):
+            book.get(f"order-{index}").pending_cancel = f"cancel-{index}"
+        policy = RandomCancelPolicy(interval=1.0)
+        order, wait = policy.select(book, 0.0)
+        self.assertTrue(order is None or order.cl_ord_id == "order-3")
+        if order is None:
+            self.assertEqual(wait, 1.0) # retried after the interval, not on the next state change
+
+    def test_random_policy_retries_when_all_pending(self):
+        book = OrderBook()
+        book.add(Order("order-0", "MSFT", '1', 10, 100.0))
+        book.get("order-0").pending_cancel = "cancel-0"
+        self.assertEqual(RandomCancelPolicy(interval=0.5).select(book, 0.0), (None, 0.5))
+
+    def test_scheduler_retries_after_an_unanswered_cancel(self):
+        order_manager = FakeOrderManager()
+        order_manager.active_orders.add(Order("order-0", "MSFT", '1', 10, 100.0))
+        scheduler = CancelScheduler(order_manager, None, None, RandomCancelPolicy(interval=0.01))
+        thread = threading.Thread(target=scheduler.run, kwargs={'duration': 5})
+        thread.start()
+        while not order_manager.cancelled:
+            time.sleep(0.001)
+        time.sleep(0.05) # the order stays pending cancel, nothing else changes
+        with order_manager.state_changed:
+            # the cancel expired without a state notification; the scheduler must find the order again
+            order_manager.active_orders.get("order-0").pending_cancel = None
+        deadline = time.monotonic() + 2
+        while len(order_manager.cancelled) < 2 and time.monotonic() < deadline:
+            time.sleep(0.001)
+        scheduler.stop()
+        thread.join(5)
+        self.assertEqual(order_manager.cancelled[:2], ["order-0", "order-0"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+# check that the event queue keeps the events in order across wrap-around and overflow
+
+import threading
+import unittest
+from event_queue import EventQueue
+
+
+class EventQueueTest(unittest.TestCase):
+    def test_wrap_around(self):
+        queue = EventQueue(4)
+        received = []
+        for start in range(0, 30, 3): # batches of 3 in a ring of 4 wrap around repeatedly
+            for event in range(start, start + 3):
+                queue.put(event)
+            received += queue.drain(0)
+        self.assertEqual(received, list(range(30)))
+        self.assertEqual(queue.overflows, 0)
+        self.assertEqual(len(queue), 0)
+
+    def test_overflow_order(self):
+        queue = EventQueue(4)
+        for event in range(10):
+            queue.put(event)
+        self.assertEqual(queue.overflows, 6)
+        self.assertEqual(len(queue), 10)
+        self.assertEqual(queue.drain(0), list(range(10)))
+        # once the overflow is drained the ring is used again
+        for event in range(10, 13):
+            queue.put(event)
+        self.assertEqual(queue.drain(0), [10, 11, 12])
+        self.assertEqual(queue.overflows, 6)
+
+    def test_posted_events(self):
+        queue = EventQueue(4)
+        queue.put(1)
+        queue.post('posted')
+        self.assertEqual(len(queue), 2)
+        self.assertEqual(queue.drain(0), [1, 'posted'])
+
+    def test_drain_timeout_and_wakeup(self):
+        queue = EventQueue(4)
+        self.assertEqual(queue.drain(0.01), [])
+        timer = threading.Timer(0.05, queue.put, ('late',))
+        timer.start()
+        self.assertEqual(queue.drain(5), ['late'])
+        timer.join()
+
+    def test_producer_consumer_threads(self):
+        queue = EventQueue(64)
+        count = 100000
+        received = []
+
+        def consume():
+            while len(received) < count:
+                received.extend(queue.drain(1))
+
+        consumer = threading.Thread(target=consume)
+        consumer.start()
+        for event in range(count):
+            queue.put(event)
+        consumer.join(30)
+        self.assertEqual(received, list(range(count)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,129 @@
+# check the in-flight window's AIMD sizing, expiry and discard with a manual clock
+
+import threading
+import unittest
+from flow_control import InFlightWindow
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class InFlightWindowTest(unittest.TestCase):
+    def window(self, **kwargs):
+        self.clock = Clock()
+        self.expired = []
+        kwargs.setdefault('on_expire', self.expired.append)
+        return InFlightWindow(clock=self.clock, **kwargs)
+
+    def round_trip(self, window, key, latency):
+        self.assertTrue(window.acquire(key, 0))
+        self.clock.now += latency
+        return window.release(key)
+
+    def test_additive_increase(self):
+        window = self.window(initial=10, target_latency=0.01)
+        for index in range(10): # about one more per window of acks
+            self.assertAlmostEqual(self.round_trip(window, index, 0.001), 0.001)
+        self.assertEqual(window.capacity, 10)
+        self.assertAlmostEqual(window.size, 10.96, places=2)
+        for index in range(10, 30):
+            self.round_trip(window, index, 0.001)
+        self.assertEqual(window.capacity, 12)
+
+    def test_multiplicative_decrease_once_per_round_trip(self):
+        window = self.window(initial=100, target_latency=0.01)
+        self.clock.now = 1.0
+        for index in range(5):
+            window.acquire(index, 0)
+        self.clock.now += 0.05 # every ack above the target
+        for index in range(5):
+            window.release(index)
+        self.assertEqual(window.capacity, 70) # the burst of slow acks only counts once
+        self.clock.now += 0.1
+        self.round_trip(window, 'late', 0.05)
+        self.assertEqual(window.capacity, 49)
+
+    def test_bounds(self):
+        window = self.window(initial=5, minimum=4, maximum=6, target_latency=0.01)
+        for index in range(100):
+            self.round_trip(window, index, 0.001)
+        self.assertEqual(window.capacity, 6)
+        for index in range(100):
+            self.clock.now += 1.0
+            self.round_trip(window, index, 0.5)
+        self.assertEqual(window.capacity, 4)
+
+    def test_base_latency_follows_a_lasting_slowdown(self):
+        window = self.window(initial=10, base_period=1.0)
+        for index in range(20):
+            self.round_trip(window, index, 0.001)
+        self.assertAlmostEqual(window.base_latency, 0.001)
+        for index in range(20, 200):
+            self.round_trip(window, index, 0.02)
+        self.assertAlmostEqual(window.base_latency, 0.02)
+
+    def test_full_window(self):
+        window = self.window(initial=4, minimum=4)
+        for index in range(4):
+            self.assertTrue(window.acquire(index, 0))
+        self.assertFalse(window.acquire('full', 0))
+        self.assertEqual(window.in_flight, 4)
+        self.assertIsNone(window.release('unknown'))
+
+    def test_waiting_sender_wakes_on_release(self):
+        window = InFlightWindow(initial=1, minimum=1)
+        window.acquire('first')
+        threading.Timer(0.05, window.release, ('first',)).start()
+        self.assertTrue(window.acquire('second', 5))
+        self.assertEqual(list(window.pending), ['second'])
+
+    def test_discard(self):
+        window = self.window(initial=4, minimum=4)
+        for index in range(4):
+            window.acquire(index, 0)
+        size = window.size
+        window.discard(2)
+        window.discard('unknown')
+        self.assertEqual(window.in_flight, 3)
+        self.assertEqual(window.size, size) # no latency sample
+        self.assertTrue(window.acquire('next', 0))
+
+    def test_expiry(self):
+        window = self.window(initial=10, minimum=2, expiry=5.0)
+        window.acquire('old', 0)
+        self.clock.now = 3.0
+        window.acquire('recent', 0)
+        self.clock.now = 6.0
+        self.assertEqual(window.expire(), ['old'])
+        self.assertEqual(self.expired, ['old'])
+        self.assertEqual(window.capacity, 7) # shrunk
+        self.assertEqual(window.expired, 1)
+        self.assertIsNone(window.release('old')) # a late answer is ignored
+
+    def test_expiry_on_acquire_and_release(self):
+        window = self.window(initial=10, expiry=5.0)
+        window.acquire('a', 0)
+        self.clock.now = 6.0
+        window.acquire('b', 0)
+        self.assertEqual(self.expired, ['a'])
+        window.acquire('c', 0)
+        self.clock.now = 12.0
+        window.release('c')
+        self.assertEqual(self.expired, ['a', 'b'])
+        self.assertEqual(window.in_flight, 0)
+
+    def test_clear(self):
+        window = self.window(initial=10)
+        for index in range(3):
+            window.acquire(index, 0)
+        self.assertEqual(window.clear(), [0, 1, 2])
+        self.assertEqual(window.in_flight, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+# check that the journal recovers from torn writes across restarts
+
+import os
+import shutil
+import tempfile
+import unittest
+
+try:
+    import quickfix
+except ImportError: # the journal imports the execution events from order_manager, which needs quickfix
+    quickfix = None
+
+
+@unittest.skipIf(quickfix is None, "quickfix is not installed")
+class JournalTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'orders.0.journal')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def journal(self):
+        from journal import Journal
+        return Journal(self.path, chunk_size=4096)
+
+    def events(self):
+        journal = self.journal()
+        try:
+            return [event for _, event in journal.read()]
+        finally:
+            journal.close()
+
+    def test_torn_write_then_two_restarts(self):
+        from journal import HEADER
+        from order_manager import ExecutionEvent, EVENT_NEW, EVENT_FILL, EVENT_CANCEL
+        first = ExecutionEvent(EVENT_NEW, 'order-1', None, 'MSFT', '1', 150.0, 100.0)
+        second = ExecutionEvent(EVENT_FILL, 'order-1', None, 'MSFT', '1', 150.5, 40.0)
+        journal = self.journal()
+        journal.append(first)
+        journal.append(ExecutionEvent(EVENT_NEW, 'a-much-longer-order-id', 'another-long-order-id', 'AAPL', '2', 180.0, 10.0))
+        # tear the last record: its payload is written, but its length was never committed
+        torn = journal.offset - (HEADER.size + len('a-much-longer-order-id') + len('another-long-order-id') + 5)
+        journal.map[torn:torn + 4] = bytes(4)
+        journal.close()
+
+        journal = self.journal() # first restart, then a shorter record over the torn one
+        self.assertEqual(journal.offset, torn)
+        journal.append(second)
+        journal.close()
+
+        self.assertEqual(self.events(), [first, second]) # second restart
+
+        journal = self.journal()
+        journal.append(ExecutionEvent(EVENT_CANCEL, 'cancel-1', 'order-1', None, None, None, None))
+        journal.close()
+        self.assertEqual(len(self.events()), 3)
+
+    def test_stops_at_invalid_record(self):
+        from order_manager import ExecutionEvent, EVENT_NEW
+        event = ExecutionEvent(EVENT_NEW, 'order-1', None, 'MSFT', '1', 150.0, 100.0)
+        journal = self.journal()
+        journal.append(event)
+        end = journal.offset
+        journal.map[end:end + 8] = b'\xff' * 8 # garbage length and kind past the end marker
+        journal.close()
+        self.assertEqual(self.events(), [event])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+# check the order book's indexes and random sampling against a plain dictionary
+
+import random
+import unittest
+from collections import Counter
+from order_book import Order, OrderBook
+
+
+class OrderBookTest(unittest.TestCase):
+    def assertConsistent(self, book, expected):
+        self.assertEqual(set(book), set(expected))
+        self.assertEqual(len(book), len(expected))
+        ids = book.ids
+        self.assertEqual(sorted(ids.items), sorted(expected))
+        for position, cl_ord_id in enumerate(ids.items):
+            self.assertEqual(ids.positions[cl_ord_id], position)
+        for symbol in {order.symbol for order in expected.values()} | set(book.symbol_index):
+            self.assertEqual(set(book.by_symbol(symbol)), {cl_ord_id for cl_ord_id, order in expected.items() if order.symbol == symbol})
+        for side in {order.side for order in expected.values()} | set(book.side_index):
+            self.assertEqual(set(book.by_side(side)), {cl_ord_id for cl_ord_id, order in expected.items() if order.side == side})
+
+    def test_add_fill_remove(self):
+        rng = random.Random(1)
+        book, expected = OrderBook(), {}
+        for step in range(5000):
+            action = rng.random()
+            if action < 0.5 or not expected:
+                order = Order(f"order-{step}", rng.choice(["MSFT", "AAPL", "BAC"]), rng.choice('125'), rng.randint(1, 10), 100.0)
+                book.add(order)
+                expected[order.cl_ord_id] = order
+            elif action < 0.8:
+                cl_ord_id = rng.choice(sorted(expected))
+                order = expected[cl_ord_id]
+                self.assertIs(book.fill(cl_ord_id, rng.randint(1, order.quantity)), order)
+                if order.filled_quantity >= order.quantity:
+                    del expected[cl_ord_id]
+            else:
+                cl_ord_id = rng.choice(sorted(expected))
+                self.assertIs(book.remove(cl_ord_id), expected.pop(cl_ord_id))
+            if step % 500 == 0:
+                self.assertConsistent(book, expected)
+        self.assertConsistent(book, expected)
+
+    def test_unknown_orders(self):
+        book = OrderBook()
+        self.assertIsNone(book.remove("missing"))
+        self.assertIsNone(book.fill("missing", 1))
+        self.assertIsNone(book.sample())
+
+    def test_sample_is_uniform(self):
+        book = OrderBook()
+        for index in range(10):
+            book.add(Order(f"order-{index}", "MSFT", '1', 10, 100.0))
+        book.remove("order-3") # the last order is swapped into its slot
+        rng = random.Random(2)
+        counts = Counter(book.sample(rng).cl_ord_id for _ in range(9000))
+        self.assertEqual(set(counts), {f"order-{index}" for index in range(10) if index != 3})
+        for count in counts.values():
+            self.assertGreater(count, 800)
+            self.assertLess(count, 1200)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+# check that the OrderManager worker survives failing events and listeners
+
+import logging
+import unittest
+
+try:
+    import quickfix
+except ImportError: # order_manager builds the orders with quickfix
+    quickfix = None
+
+
+@unittest.skipIf(quickfix is None, "quickfix is not installed")
+class OrderManagerWorkerTest(unittest.TestCase):
+    def setUp(self):
+        from order_manager import OrderManager
+        self.order_manager = OrderManager()
+        self.order_manager.start()
+        logging.disable(logging.CRITICAL) # the failures are logged on purpose
+
+    def tearDown(self):
+        self.order_manager.stop()
+        logging.disable(logging.NOTSET)
+
+    def send(self, cl_ord_id):
+        from order_manager import ExecutionEvent, EVENT_NEW, EVENT_FILL
+        self.order_manager.submit_order(cl_ord_id)
+        self.order_manager.on_execution(ExecutionEvent(EVENT_NEW, cl_ord_id, None, 'MSFT', '1', 150.0, 100))
+        self.order_manager.on_execution(ExecutionEvent(EVENT_FILL, cl_ord_id, None, 'MSFT', '1', 150.0, 100))
+
+    def test_raising_listener(self):
+        def listener(event, order):
+            if order.cl_ord_id == 'order-1':
+                raise RuntimeError("listener failed")
+        self.order_manager.add_listener(listener)
+        self.send('order-1')
+        self.send('order-2')
+        self.assertTrue(self.order_manager.wait_until_drained(timeout=5))
+        self.assertTrue(self.order_manager.worker.is_alive())
+        self.assertEqual(self.order_manager.orders_sent, 2)
+        self.assertEqual(len(self.order_manager.trade_data), 2)
+
+    def test_failing_event(self):
+        self.order_manager.on_execution(('unpackable',)) # apply_event raises on it
+        self.send('order-1')
+        self.assertTrue(self.order_manager.wait_until_drained(timeout=5))
+        self.assertTrue(self.order_manager.worker.is_alive())
+
+
+if __name__ == "__main__":
+    unittest.main()
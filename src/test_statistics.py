@@ -0,0 +1,55 @@
+# check that the incremental statistics match the batch functions exactly
+
+import random
+import unittest
+from statistics import StatisticsAccumulator, calculate_statistics
+
+
+def random_fills(count, seed):
+    rng = random.Random(seed)
+    fills = []
+    for _ in range(count):
+        fills.append({
+            'symbol': rng.choice(["MSFT", "AAPL", "BAC"]),
+            'price': round(rng.uniform(100, 200), 2),
+            'quantity': rng.randint(1, 100),
+            'side': rng.choice([1, 2, 5]),
+        })
+    return fills
+
+
+class StatisticsAccumulatorTest(unittest.TestCase):
+    def accumulate(self, fills):
+        accumulator = StatisticsAccumulator()
+        for fill in fills:
+            accumulator.add_fill(fill['symbol'], fill['price'], fill['quantity'], fill['side'])
+        return accumulator
+
+    def test_matches_batch_functions(self):
+        fills = random_fills(20000, seed=1)
+        self.assertEqual(self.accumulate(fills).snapshot(), calculate_statistics(fills))
+
+    def test_fix_char_sides(self):
+        # quickfix returns the side as a FIX char
+        fills = random_fills(1000, seed=2)
+        as_chars = [dict(fill, side=str(fill['side'])) for fill in fills]
+        self.assertEqual(self.accumulate(as_chars).snapshot(), calculate_statistics(fills))
+
+    def test_merge_matches_single_accumulator(self):
+        fills = random_fills(1000, seed=3)
+        merged = self.accumulate(fills[:500])
+        merged.merge(self.accumulate(fills[500:]))
+        expected = self.accumulate(fills).snapshot()
+        actual = merged.snapshot()
+        self.assertEqual(actual['total_volume'], expected['total_volume'])
+        self.assertEqual(actual['vwap'], expected['vwap'])
+        for symbol, pnl in expected['pnl'].items():
+            self.assertAlmostEqual(actual['pnl'][symbol], pnl, places=6)
+        self.assertEqual(merged.fill_count, len(fills))
+
+    def test_empty(self):
+        self.assertEqual(StatisticsAccumulator().snapshot(), calculate_statistics([]))
+
+
+if __name__ == "__main__":
+    unittest.main()
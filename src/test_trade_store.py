@@ -0,0 +1,49 @@
+# check the vectorized trade store aggregations against the batch functions
+
+import unittest
+from statistics import StatisticsAccumulator, calculate_statistics
+from test_statistics import random_fills
+from trade_store import TradeStore
+
+
+class TradeStoreTest(unittest.TestCase):
+    def store(self, fills):
+        store = TradeStore()
+        for fill in fills:
+            store.append(fill['symbol'], fill['price'], fill['quantity'], fill['side'])
+        return store
+
+    def test_matches_batch_functions(self):
+        fills = random_fills(20000, seed=4)
+        self.assertEqual(self.store(fills).statistics(), calculate_statistics(fills))
+
+    def test_matches_accumulator(self):
+        fills = random_fills(20000, seed=5)
+        accumulator = StatisticsAccumulator()
+        for fill in fills:
+            accumulator.add_fill(fill['symbol'], fill['price'], fill['quantity'], fill['side'])
+        self.assertEqual(self.store(fills).statistics(), accumulator.snapshot())
+
+    def test_append_after_aggregation(self):
+        store = self.store(random_fills(100, seed=6))
+        store.statistics()
+        store.append("MSFT", 150.0, 10, 1)
+        self.assertEqual(len(store), 101)
+
+    def test_copy_is_independent(self):
+        store = self.store(random_fills(100, seed=7))
+        copy = store.copy()
+        store.append("IBM", 150.0, 10, 1)
+        self.assertEqual(len(copy), 100)
+        self.assertNotIn("IBM", copy.statistics()['total_volume'])
+
+    def test_many_symbols(self):
+        store = TradeStore()
+        for index in range(70000):
+            store.append(f"S{index}", 1.0, 1, 2)
+        self.assertEqual(store[69999]['symbol'], "S69999")
+        self.assertEqual(store.total_volume()["S69999"], 1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,163 @@
+# columnar storage of filled trades, with vectorized per-symbol aggregations
+
+from array import array
+import numpy as np
+
+
+class TradeStore:
+    """
+    Append-only columnar store of fills.
+
+    Each fill is kept as one entry in growable typed arrays (price, quantity, side) plus an
+    interned symbol code, which is about 21 bytes per fill instead of a dictionary per fill.
+    The aggregations group by symbol code with NumPy. They work on copies
+    of the columns, so fills can be appended while an aggregation runs; copy() takes a
+    consistent copy of the whole store, e.g. under the OrderManager's lock, to aggregate it
+    outside of the lock.
+    Iterating the store yields trade dictionaries, so it can still be passed to the batch
+    functions in statistics.py.
+    """
+    def __init__(self):
+        self.prices = array('d')
+        self.quantities = array('d')
+        self.sides = array('b')
+        self.codes = array('I')
+        self.symbols = [] # code -> symbol
+        self.symbol_codes = {} # symbol -> code
+
+    def __len__(self):
+        return len(self.prices)
+
+    def __iter__(self):
+        symbols = self.symbols
+        for code, price, quantity, side in zip(self.codes, self.prices, self.quantities, self.sides):
+            yield {'symbol': symbols[code], 'price': price, 'quantity': quantity, 'side': side}
+
+    def __getitem__(self, index):
+        return {
+            'symbol': self.symbols[self.codes[index]],
+            'price': self.prices[index],
+            'quantity': self.quantities[index],
+            'side': self.sides[index]
+        }
+
+    def copy(self):
+        """
+        Returns:
+            TradeStore: A copy of the store's fills and symbols.
+        """
+        store = TradeStore()
+        store.prices = array('d', self.prices)
+        store.quantities = array('d', self.quantities)
+        store.sides = array('b', self.sides)
+        store.codes = array('I', self.codes)
+        store.symbols = list(self.symbols)
+        store.symbol_codes = dict(self.symbol_codes)
+        return store
+
+    def symbol_code(self, symbol):
+        """
+        Return the interned code for a symbol, assigning a new one if needed.
+
+        Args:
+            symbol (str): The symbol being traded.
+
+        Returns:
+            int: The symbol code.
+        """
+        code = self.symbol_codes.get(symbol)
+        if code is None:
+            code = len(self.symbols)
+            self.symbols.append(symbol)
+            self.symbol_codes[symbol] = code
+        return code
+
+    def append(self, symbol, price, quantity, side):
+        """
+        Record a fill.
+
+        Args:
+            symbol (str): The symbol being traded.
+            price (float): The price of the trade.
+            quantity (int): The quantity of the trade.
+            side (int): The side of the trade (BUY, SELL, or SHORT).
+        """
+        self.codes.append(self.symbol_code(symbol))
+        self.prices.append(price)
+        self.quantities.append(quantity)
+        self.sides.append(int(side))
+
+    def _columns(self):
+        # the slices are private copies: append raises BufferError while a view of the live
+        # arrays exists, and the symbol codes are appended first, so cut every column to the
+        # same number of fills
+        count = len(self.prices)
+        columns = self.codes[:count], self.prices[:count], self.quantities[:count], self.sides[:count]
+        return tuple(np.frombuffer(column, dtype=dtype) for column, dtype in zip(columns, (np.uint32, np.float64, np.float64, np.int8)))
+
+    def _group_sum(self, codes, weights):
+        # sum the weights per symbol code, in fill order
+        symbols = self.symbols[:]
+        sums = np.bincount(codes, weights=weights, minlength=len(symbols))
+        return {symbol: float(sums[code]) for code, symbol in enumerate(symbols)}
+
+    @staticmethod
+    def _values(prices, quantities):
+        return prices * quantities
+
+    def _total_volume(self, codes, values):
+        return {k: round(v, 2) for k, v in self._group_sum(codes, values).items()}
+
+    def _pnl(self, codes, values, sides):
+        signs = np.where(sides == 1, -1.0, np.where((sides == 2) | (sides == 5), 1.0, 0.0))
+        return self._group_sum(codes, values * signs)
+
+    def _vwap(self, codes, values, quantities):
+        total_value = self._group_sum(codes, values)
+        total_quantity = self._group_sum(codes, quantities)
+        return {k: round(v / total_quantity[k], 2) for k, v in total_value.items()}
+
+    def total_volume(self):
+        """
+        Calculate the total trading volume for each symbol.
+
+        Returns:
+            dict: Dictionary containing total volume for each symbol, rounded to 2 decimal places.
+        """
+        codes, prices, quantities, _ = self._columns()
+        return self._total_volume(codes, self._values(prices, quantities))
+
+    def pnl(self):
+        """
+        Calculate the profit and loss (PnL) for each symbol.
+
+        Returns:
+            dict: Dictionary containing PnL for each symbol.
+        """
+        codes, prices, quantities, sides = self._columns()
+        return self._pnl(codes, self._values(prices, quantities), sides)
+
+    def vwap(self):
+        """
+        Calculate the volume-weighted average price (VWAP) for each symbol.
+
+        Returns:
+            dict: Dictionary containing VWAP for each symbol, rounded to 2 decimal places.
+        """
+        codes, prices, quantities, _ = self._columns()
+        return self._vwap(codes, self._values(prices, quantities), quantities)
+
+    def statistics(self):
+        """
+        Calculate the total volume, PnL and VWAP for each symbol.
+
+        Returns:
+            dict: Dictionary with 'total_volume', 'pnl' and 'vwap' per symbol.
+        """
+        codes, prices, quantities, sides = self._columns()
+        values = self._values(prices, quantities)
+        return {
+            'total_volume': self._total_volume(codes, values),
+            'pnl': self._pnl(codes, values, sides),
+            'vwap': self._vwap(codes, values, quantities)
+        }